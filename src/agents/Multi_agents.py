@@ -12,6 +12,8 @@ import os
 from dotenv import load_dotenv
 from crewai import Agent, LLM
 from langchain_openai import AzureChatOpenAI
+from runtime.deadline import call_timeout, check_deadline
+from runtime.instrumentation import LLMMetricsCallback, install_litellm_metrics
 
 # Load environment variables
 load_dotenv('.env')
@@ -29,7 +31,31 @@ os.environ['AZURE_API_VERSION'] = AZURE_OPENAI_API_VERSION
 
 # Initialize the AzureChatOpenAI instance
 llm = AzureChatOpenAI(azure_deployment=AZURE_OPENAI_DEPLOYMENT_NAME, 
-                      api_version=AZURE_OPENAI_API_VERSION)
+                      api_version=AZURE_OPENAI_API_VERSION,
+                      callbacks=[LLMMetricsCallback(f"azure/{AZURE_OPENAI_DEPLOYMENT_NAME}")])
+
+class DeadlineLLM(LLM):
+    """
+    crewAI LLM bounded by the request deadline: each call gets the time left as its timeout,
+    and no call is started once the deadline has passed (raises DeadlineExceeded).
+    Its requests (made through LiteLLM) are reported to the metrics registry.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # LLM.__init__ resets LiteLLM's callback lists (unless LITELLM_*_CALLBACKS are set):
+        # register the metrics callbacks again after every agent build
+        install_litellm_metrics()
+
+    def call(self, *args, **kwargs):
+        self.timeout = call_timeout(None)
+        return super().call(*args, **kwargs)
+
+def stop_at_deadline(step):
+    """
+    Agent step callback ending the agent run (DeadlineExceeded) once the request deadline has passed.
+    """
+    check_deadline()
 
 # Agent Definitions
 # ------------------
@@ -43,7 +69,9 @@ class StockAgents:
     def StockAgent():
         """
         Stock analysis agent to analyze real-time stock data, news, or comparisons.
+        Each LLM call and agent step is checked against the request deadline.
         """
+        from tools.StockSnapshot_tool import SnapshotTools
         from tools.YahooFinance_tool import YHTools
         from tools.Polygone_tool import Tools
 
@@ -59,13 +87,15 @@ class StockAgents:
                 and give a concise summary."""
             ),
             tools=[
+                SnapshotTools.get_stock_snapshot,
                 YHTools.get_yahoo_finance_data,
                 Tools.get_polygon_news,
                 YHTools.get_yahoo_finance_data_comparison
             ],
             verbose=True,
             allow_delegation=False,
-            llm=LLM(model=f'azure/{AZURE_OPENAI_DEPLOYMENT_NAME}')
+            llm=DeadlineLLM(model=f'azure/{AZURE_OPENAI_DEPLOYMENT_NAME}'),
+            step_callback=stop_at_deadline
         )
 
 class SearchAgents:
@@ -92,7 +122,8 @@ class SearchAgents:
             ],
             verbose=True,
             allow_delegation=False,
-            llm=LLM(model=f'azure/{AZURE_OPENAI_DEPLOYMENT_NAME}')
+            llm=DeadlineLLM(model=f'azure/{AZURE_OPENAI_DEPLOYMENT_NAME}'),
+            step_callback=stop_at_deadline
         )
 
 class WeatherAgents:
@@ -114,9 +145,11 @@ class WeatherAgents:
                 """You are a weather analyst. Your task is to look into weather data and answer queries."""
             ),
             tools=[
-                WeatherTools.get_weather
+                WeatherTools.get_weather,
+                WeatherTools.get_weather_batch
             ],
             verbose=True,
             allow_delegation=False,
-            llm=LLM(model=f'azure/{AZURE_OPENAI_DEPLOYMENT_NAME}')
+            llm=DeadlineLLM(model=f'azure/{AZURE_OPENAI_DEPLOYMENT_NAME}'),
+            step_callback=stop_at_deadline
         )
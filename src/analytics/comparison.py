@@ -0,0 +1,121 @@
+"""
+Subfolder: analytics
+Role: Local, vectorized computations over market data, so the agents receive finished numbers
+instead of raw dumps to do arithmetic on.
+
+File: comparison.py
+Purpose: Comparison analytics for `stock_comparison` queries. All tickers' price and volume
+series are aligned on a common time index and every metric is computed in one pandas/NumPy
+pass over the ticker columns, so the cost stays near-linear in the number of tickers:
+- normalized return over the period,
+- relative strength against the equal-weight basket of the compared tickers,
+- rolling volatility of log returns (latest window),
+- maximum drawdown,
+- volume ratio (latest volume against the period average),
+- correlation of returns (average, closest peer and, for small lists, the full matrix).
+"""
+
+import numpy as np
+import pandas as pd
+
+ROLLING_WINDOW = 20  # bars in the rolling volatility window
+FULL_CORRELATION_MAX_TICKERS = 6  # larger lists only get per-ticker correlation summaries
+
+
+def align_prices(closes, volumes):
+    """
+    Aligns close and volume series on their common index.
+
+    Args:
+        closes (DataFrame): Close prices, one column per ticker.
+        volumes (DataFrame): Traded volumes, one column per ticker.
+
+    Returns:
+        tuple: Close and volume DataFrames sharing the same sorted index, with gaps in the
+        prices forward-filled (a ticker that did not trade keeps its last price).
+    """
+    index = closes.index.union(volumes.index).sort_values()
+    closes = closes.reindex(index).ffill().dropna(how="all")
+    volumes = volumes.reindex(closes.index).fillna(0.0)
+    return closes, volumes
+
+
+def comparison_metrics(closes, volumes, window=ROLLING_WINDOW):
+    """
+    Computes the comparison metrics of every ticker in one vectorized pass.
+
+    Args:
+        closes (DataFrame): Aligned close prices, one column per ticker.
+        volumes (DataFrame): Aligned volumes, one column per ticker.
+        window (int): Number of bars in the rolling volatility window.
+
+    Returns:
+        tuple: A metrics DataFrame indexed by ticker, and the correlation matrix of returns.
+    """
+    prices = closes.to_numpy(dtype=float)
+    first = _first_valid(prices)
+    last = prices[-1]
+
+    total_return = last / first - 1.0
+    basket_return = np.nanmean(total_return)
+
+    log_returns = np.log(closes).diff()
+    rolling_volatility = log_returns.rolling(window, min_periods=2).std().iloc[-1].to_numpy()
+
+    running_peak = np.fmax.accumulate(np.nan_to_num(prices, nan=-np.inf), axis=0)
+    max_drawdown = np.nanmin(prices / running_peak - 1.0, axis=0)
+
+    volume_values = volumes.to_numpy(dtype=float)
+    mean_volume = volume_values.mean(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        volume_ratio = np.where(mean_volume > 0, volume_values[-1] / mean_volume, np.nan)
+
+    correlation = log_returns.corr()
+    peers = correlation.to_numpy(copy=True)
+    np.fill_diagonal(peers, np.nan)
+    has_peer = ~np.isnan(peers).all(axis=1)
+    average_correlation = pd.DataFrame(peers).mean(axis=1).to_numpy()
+    closest = np.nan_to_num(peers, nan=-np.inf).argmax(axis=1)
+    closest_peer = np.where(has_peer, correlation.columns.to_numpy()[closest], "")
+
+    metrics = pd.DataFrame({
+        "last": last,
+        "return_%": total_return * 100,
+        "rel_strength_%": (total_return - basket_return) * 100,
+        f"volatility_{window}_%": rolling_volatility * 100,
+        "max_drawdown_%": max_drawdown * 100,
+        "volume_ratio": volume_ratio,
+        "avg_corr": average_correlation,
+        "closest_peer": closest_peer,
+    }, index=closes.columns)
+    metrics.index.name = "ticker"
+    return metrics.sort_values("return_%", ascending=False), correlation
+
+
+def format_comparison(metrics, correlation):
+    """
+    Renders the metrics (and the correlation matrix for short lists) as a compact text table.
+    """
+    text = metrics.round(2).to_string()
+    if len(correlation) <= FULL_CORRELATION_MAX_TICKERS:
+        text += "\n\nCorrelation of returns:\n" + correlation.round(2).to_string()
+    return text
+
+
+def compare(closes, volumes, window=ROLLING_WINDOW):
+    """
+    Aligns the series, computes the comparison metrics and returns the compact text table.
+    """
+    closes, volumes = align_prices(closes, volumes)
+    if closes.empty:
+        return "Data unavailable"
+    return format_comparison(*comparison_metrics(closes, volumes, window))
+
+
+def _first_valid(prices):
+    """
+    Returns the first non-missing price of each column.
+    """
+    valid = ~np.isnan(prices)
+    first_rows = valid.argmax(axis=0)
+    return prices[first_rows, np.arange(prices.shape[1])]
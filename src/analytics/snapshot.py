@@ -0,0 +1,89 @@
+"""
+Subfolder: analytics
+Role: Local, vectorized computations over market data, so the agents receive finished numbers
+instead of raw dumps to do arithmetic on.
+
+File: snapshot.py
+Purpose: The one-call "stock snapshot" behind `get_stock_snapshot`. Market data (price history
+and company info) and recent news are fetched concurrently and merged into one compact payload, so a
+"how is NVDA doing and why" question needs a single tool step from the StockAgent instead of
+one LLM round trip per source. A source that fails or runs past the deadline is reported in
+its section, and the rest of the snapshot is still returned.
+"""
+
+from runtime.deadline import DeadlineExceeded, gather_until_deadline
+
+# Company info fields worth handing to the LLM (the full `info` dict has well over 100 entries)
+INFO_FIELDS = [
+    "longName", "sector", "industry", "currency", "currentPrice", "previousClose", "open",
+    "dayLow", "dayHigh", "volume", "averageVolume", "marketCap", "trailingPE", "forwardPE",
+    "dividendYield", "fiftyTwoWeekLow", "fiftyTwoWeekHigh", "recommendationKey", "targetMeanPrice",
+]
+SUMMARY_MAX_CHARS = 400
+NEWS_FIELDS = ["published_utc", "title", "description", "article_url"]
+
+
+def build_snapshot(ticker, fetch_market, fetch_news):
+    """
+    Fetches a ticker's market data and news concurrently and formats them as one payload.
+
+    Args:
+        ticker (str): The stock ticker symbol.
+        fetch_market (callable): `fetch_market(ticker)` returns `(info, history_text)`.
+        fetch_news (callable): `fetch_news(ticker)` returns a list of news articles.
+
+    Returns:
+        str: The snapshot.
+
+    Raises:
+        DeadlineExceeded: If neither source could be fetched before the deadline.
+        RuntimeError: If neither source could be fetched.
+    """
+    results = gather_until_deadline({
+        "market": (fetch_market, ticker),
+        "news": (fetch_news, ticker),
+    })
+    market, news = results["market"], results["news"]
+    if isinstance(market, Exception) and isinstance(news, Exception):
+        if isinstance(market, DeadlineExceeded) or isinstance(news, DeadlineExceeded):
+            raise DeadlineExceeded("Request deadline exceeded")
+        raise RuntimeError(f"market data: {market}; news: {news}")
+    return "\n\n".join([
+        f"Stock snapshot for {ticker}",
+        format_market(market),
+        format_news(news),
+    ])
+
+
+def format_market(market):
+    """
+    Formats `(info, history_text)` as the key company figures and the recent price history.
+    """
+    if isinstance(market, Exception):
+        return f"Market data: unavailable ({market})"
+    info, history = market
+    lines = ["Key figures:"]
+    lines += [f"- {field}: {info[field]}" for field in INFO_FIELDS if info.get(field) is not None]
+    summary = info.get("longBusinessSummary")
+    if summary:
+        lines.append(f"- businessSummary: {summary[:SUMMARY_MAX_CHARS]}")
+    lines += ["Recent price history:", history]
+    return "\n".join(lines)
+
+
+def format_news(news):
+    """
+    Formats Polygon.io articles as one line per article.
+    """
+    if isinstance(news, Exception):
+        return f"Recent news: unavailable ({news})"
+    if not news:
+        return "Recent news: none found"
+    lines = ["Recent news:"]
+    for article in news:
+        fields = [str(article[field]) for field in NEWS_FIELDS if article.get(field)]
+        publisher = (article.get("publisher") or {}).get("name")
+        if publisher:
+            fields.insert(1, publisher)
+        lines.append("- " + " | ".join(fields))
+    return "\n".join(lines)
@@ -4,21 +4,33 @@
 #
 # The key components of the refactored code are:
 # 
-# 1. **Workflow Setup (`create_workflow` function)**: Assembles the state graph and adds nodes that correspond to specific query types.
+# 1. **Workflow Setup (`create_workflow` function, see `orchestrator/workflow.py`)**: Assembles the state graph and adds nodes that correspond to specific query types.
 # 2. **Message Streaming**: Allows for real-time streaming of responses to users.
 # 3. **Modular Design**: Functions are separated to handle specific tasks, improving maintainability and extensibility.
-
-
-from nodes.nodes import Nodes
-from messages.state import AgentState
-from orchestrator.task_orchestrator import Orchestrator
-from langgraph.graph import END, StateGraph
+# 4. **Request Deadlines**: Every request carries a deadline through the graph; nodes answer with partial data when it expires.
+# 5. **Resumable Runs**: The graph is checkpointed per session and question; resending a failed question
+#    resumes after the last completed node (see `runtime/checkpoint.py`).
+# 6. **Execution Modes**: The graph runs in-process by default; with EXECUTION_MODE=split, messages are enqueued
+#    onto a job queue and served by a pool of worker processes (see `workers/`).
+# 7. **Metrics**: Requests in flight, request latency by category, queue depth and the node, tool, LLM and
+#    upstream metrics are served in the Prometheus format on METRICS_PORT (see `runtime/metrics.py`).
+
+
+from orchestrator.workflow import create_resumable_workflow
+from runtime.checkpoint import prepare_run, request_config, schedule_cleanup
+from workers.job_queue import make_queue
+from workers.worker import WorkerPool
+from cache.warmer import start_default_warmer
+from runtime import metrics
 import chainlit as cl
 import requests
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
 from langchain.schema.runnable import Runnable
 from langchain.schema.runnable.config import RunnableConfig
 from typing import cast
+import os
+import time
+import uuid
 
 # Suppress SSL warnings (optional)
 requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
@@ -27,34 +39,32 @@ requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
 session = requests.Session()
 session.verify = False
 
-# Define the workflow function
-def create_workflow():
-    """
-    Assembles the workflow and returns a compiled StateGraph app.
-    """
-    workflow = StateGraph(AgentState)
-    node = Nodes()
-    workflow.add_node('entryNode', node.entryNode)
-    workflow.add_node('StockNode', node.StockNode)
-    workflow.add_node('SearchNode', node.SearchNode)
-    workflow.add_node('WeatherNode', node.WeatherNode)
-    workflow.add_node("responder", node.replyNode)
-
-    workflow.add_conditional_edges('entryNode', Orchestrator.route_query, {
-        "stock": "StockNode",
-        "search": "SearchNode",
-        "city": "WeatherNode"
-    })
-    workflow.add_edge("StockNode", END)
-    workflow.add_edge("WeatherNode", END)
-    workflow.add_edge("SearchNode", END)
-    workflow.add_edge("responder", END)
-
-    workflow.set_entry_point("entryNode")
-    return workflow.compile()
-
-# Instantiate the compiled workflow app
-app = create_workflow()
+# End-to-end time budget for a single user request, in seconds
+REQUEST_DEADLINE_SECONDS = float(os.environ.get('REQUEST_DEADLINE_SECONDS', '90'))
+
+# Execution mode: 'inprocess' runs the graph here, 'split' hands it to worker processes
+EXECUTION_MODE = os.environ.get('EXECUTION_MODE', 'inprocess')
+JOB_QUEUE_URL = os.environ.get('JOB_QUEUE_URL', 'memory://')
+WORKER_PROCESSES = int(os.environ.get('WORKER_PROCESSES', '2'))  # 0 to rely on external workers
+WORKER_THREADS = int(os.environ.get('WORKER_THREADS', '4'))
+
+REQUESTS_IN_FLIGHT = metrics.gauge("app_requests_in_flight", "User requests being answered.")
+REQUEST_SECONDS = metrics.histogram("app_request_seconds", "End-to-end latency of user requests.",
+                                    ["mode", "category", "outcome"])
+
+if EXECUTION_MODE == 'split':
+    job_queue = make_queue(JOB_QUEUE_URL)
+    worker_pool = WorkerPool(job_queue, WORKER_PROCESSES, WORKER_THREADS).start() if WORKER_PROCESSES else None
+    QUEUE_DEPTH = metrics.gauge("job_queue_depth", "Jobs waiting for a worker.")
+    metrics.register_collector(lambda: QUEUE_DEPTH.set(job_queue.depth()))
+else:
+    # Instantiate the compiled workflow app
+    app = create_resumable_workflow()
+    # Keep hot tickers and cities warm in this process (when CACHE_WARMER_ENABLED=1)
+    start_default_warmer()
+
+# Serve the metrics of this process (when METRICS_PORT is set)
+metrics.start_metrics_server()
 
 @cl.on_chat_start
 async def on_chat_start():
@@ -82,16 +92,38 @@ I'm here to assist you with a variety of tasks using the power of CrewAI's Agent
 
 @cl.on_message
 async def on_message(message):
+    started = time.perf_counter()
+    # Requests failing before categorization have no category
+    category, outcome = "unknown", "error"
+    REQUESTS_IN_FLIGHT.inc()
     try:
         # Get the user input
         user_query = message.content
-        inputs = {"query": user_query, "messages": [user_query]}
+        inputs = {"query": user_query, "messages": [user_query], "partial": False,
+                  "deadline": time.time() + REQUEST_DEADLINE_SECONDS}
+        config = request_config(cl.user_session.get("id"), user_query)
         # Create a new message object for streaming
         msg = cl.Message(content="Agent response ...\n")
         await msg.send()
 
-        # Simulate streaming output
-        result = app.invoke(inputs)  # This assumes `app.invoke` provides final output at once
+        if EXECUTION_MODE == 'split':
+            # The category is decided in the worker process and reported back with the answer
+            done = await stream_from_workers(inputs, config, msg)
+            category = done.get("category") or "unknown"
+            outcome = "partial" if done.get("partial") else "ok"
+            return
+
+        # Resume a failed run of the same question when checkpoints allow it
+        graph_input = prepare_run(app, inputs, config)
+        failed = True
+        try:
+            # Run the graph off the event loop; nodes stop at the deadline and return partial answers
+            result = await cl.make_async(app.invoke)(graph_input, config)  # This assumes `app.invoke` provides final output at once
+            failed = False
+        finally:
+            schedule_cleanup(app, config, failed)
+        category = result.get('category') or "unknown"
+        outcome = "partial" if result.get('partial') else "ok"
         agent_response = result['messages'][-1]  # Assuming 'messages' contains the response chain
          # Ensure the response is a string
         if not isinstance(agent_response, str):
@@ -107,6 +139,43 @@ async def on_message(message):
         await msg.send()
     except Exception as e:
         await cl.Message(content=f"An error occurred: {str(e)}").send()
+    finally:
+        REQUESTS_IN_FLIGHT.dec()
+        REQUEST_SECONDS.labels(EXECUTION_MODE, category, outcome).observe(time.perf_counter() - started)
+
+async def stream_from_workers(inputs, config, msg):
+    """
+    Enqueues the request for the worker pool and streams its progress and answer into `msg`.
+    Returns the job's final event, which carries the routed category.
+    """
+    job_id = uuid.uuid4().hex
+    job_queue.submit(job_id, {"query": inputs["query"], "deadline": inputs["deadline"],
+                              "thread_id": config["configurable"]["thread_id"]})
+    poll_events = cl.make_async(job_queue.poll_events)
+
+    finished = False
+    try:
+        while True:
+            for event in await poll_events(job_id, timeout=1.0):
+                if event["type"] == "progress":
+                    async with cl.Step(name=event["node"]) as step:
+                        step.output = "done"
+                elif event["type"] == "token":
+                    await msg.stream_token(event["text"])
+                elif event["type"] == "done":
+                    finished = True
+                    await msg.send()
+                    return event
+                elif event["type"] == "error":
+                    finished = True
+                    raise RuntimeError(event["message"])
+            # Give up a little after the deadline if the workers never answered
+            if time.time() > inputs["deadline"] + 30:
+                raise TimeoutError("No worker picked up the request in time")
+    finally:
+        if not finished:
+            # Timed out or the client went away: drop the job's pending and late events
+            job_queue.abandon(job_id)
 
 # Start the Chainlit app
 if __name__ == "__main__":
@@ -0,0 +1,59 @@
+"""
+Benchmark of the vectorized comparison analytics (`analytics/comparison.py`).
+
+Synthetic random-walk prices (one trading day of 1-minute bars by default, with a few gaps per
+ticker) are compared at 2, 10 and 50 tickers. The report shows the time per comparison, the time
+per ticker (flat when cost is linear) and the size of the table handed to the LLM against the
+size of the per-ticker `tail()` tables it replaces (the `info` dumps that came with them,
+usually several thousand characters per ticker, are not even counted).
+
+Run from `src/`:
+
+    python -m benchmarks.comparison_bench
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from analytics.comparison import compare
+
+
+def synthetic_market(tickers, bars, seed=0):
+    """
+    Builds close and volume frames for `tickers` random-walk stocks, with missing bars.
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2024-01-02 09:30", periods=bars, freq="min")
+    columns = [f"T{i:03d}" for i in range(tickers)]
+    returns = rng.normal(0, 0.001, size=(bars, tickers)) + rng.normal(0, 0.0005, size=(bars, 1))
+    closes = pd.DataFrame(100 * np.exp(np.cumsum(returns, axis=0)), index=index, columns=columns)
+    volumes = pd.DataFrame(rng.integers(1_000, 50_000, size=(bars, tickers)), index=index, columns=columns)
+    closes = closes.mask(rng.random((bars, tickers)) < 0.01)  # ~1% of bars missing
+    return closes, volumes
+
+
+def time_compare(closes, volumes, repeats):
+    compare(closes, volumes)  # warm-up
+    started = time.perf_counter()
+    for _ in range(repeats):
+        table = compare(closes, volumes)
+    return (time.perf_counter() - started) / repeats, table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tickers", type=int, nargs="+", default=[2, 10, 50])
+    parser.add_argument("--bars", type=int, default=390)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"bars={args.bars} repeats={args.repeats}")
+    print(f"{'tickers':>7} {'ms/compare':>10} {'ms/ticker':>9} {'table chars':>11} {'tail() chars':>12}")
+    for count in args.tickers:
+        closes, volumes = synthetic_market(count, args.bars)
+        seconds, table = time_compare(closes, volumes, args.repeats)
+        raw_chars = sum(len(closes[[c]].join(volumes[[c]], rsuffix="_volume").tail().to_string()) for c in closes)
+        print(f"{count:>7} {seconds * 1000:>10.2f} {seconds * 1000 / count:>9.3f} {len(table):>11} {raw_chars:>12}")
@@ -0,0 +1,93 @@
+"""
+Concurrency check of the tool fan-outs (`runtime.deadline.gather_until_deadline`).
+
+Many stock snapshots are built at once, as under load, through `analytics.snapshot.build_snapshot`.
+The stub market fetch fans out again (history and info), like a tool calling a fan-out helper
+from inside a fan-out branch. With more concurrent snapshots than fan-out threads, a nested
+gather that waits on the shared pool from one of its own threads deadlocks: every thread waits
+on work queued behind it. The check runs without a deadline (where such a wait never ends) and
+with one, and fails unless every snapshot completes with both sections within the time limit.
+
+Run from `src/`:
+
+    python -m benchmarks.fanout_stress --snapshots 100
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+from analytics.snapshot import build_snapshot
+from runtime.deadline import deadline_scope, gather_until_deadline
+
+STUB_SECONDS = 0.05  # simulated latency of each upstream request
+
+
+def stub_history(ticker):
+    time.sleep(STUB_SECONDS)
+    return f"{ticker} history"
+
+
+def stub_info(ticker):
+    time.sleep(STUB_SECONDS)
+    return {"longName": ticker, "currentPrice": 100.0}
+
+
+def stub_market(ticker):
+    # A fan-out nested in the snapshot's own fan-out
+    results = gather_until_deadline({"history": (stub_history, ticker), "info": (stub_info, ticker)})
+    for result in results.values():
+        if isinstance(result, Exception):
+            raise result
+    return results["info"], results["history"]
+
+
+def stub_news(ticker):
+    time.sleep(STUB_SECONDS)
+    return [{"title": f"{ticker} headline", "publisher": {"name": "Stub"}}]
+
+
+def run(snapshots, deadline_seconds, time_limit):
+    """
+    Builds `snapshots` snapshots from as many threads and returns (completed, incomplete, seconds).
+    A snapshot is incomplete if a section is unavailable or it has not returned within `time_limit`.
+    """
+    outputs = [None] * snapshots
+
+    def request(index):
+        expires_at = time.time() + deadline_seconds if deadline_seconds else None
+        with deadline_scope(expires_at):
+            outputs[index] = build_snapshot(f"T{index}", stub_market, stub_news)
+
+    threads = [threading.Thread(target=request, args=(index,), daemon=True) for index in range(snapshots)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    stop_at = started + time_limit
+    for thread in threads:
+        thread.join(max(0.0, stop_at - time.perf_counter()))
+    elapsed = time.perf_counter() - started
+    completed = sum(1 for output in outputs if output is not None and "unavailable" not in output)
+    return completed, snapshots - completed, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--snapshots", type=int, default=100)
+    parser.add_argument("--deadline", type=float, default=10.0, help="request deadline of the second run (seconds)")
+    parser.add_argument("--time-limit", type=float, default=15.0, help="seconds before a run is declared stuck")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{args.snapshots} concurrent snapshots, {STUB_SECONDS}s per upstream request")
+    for deadline_seconds in (None, args.deadline):
+        completed, incomplete, elapsed = run(args.snapshots, deadline_seconds, args.time_limit)
+        label = f"deadline {deadline_seconds}s" if deadline_seconds else "no deadline"
+        status = "ok" if incomplete == 0 else "FAILED"
+        print(f"   [{status}] {label:>13}: {completed} complete, {incomplete} incomplete or stuck in {elapsed:.2f}s")
+        failed = failed or incomplete > 0
+    # Exit without joining the pool: threads stuck in a deadlock would keep the process alive
+    sys.stdout.flush()
+    os._exit(1 if failed else 0)
@@ -0,0 +1,117 @@
+"""
+A local HTTP server that stands in for an upstream API and injects faults.
+
+Every GET is answered with a small JSON body (shaped like both a WeatherAPI and a Polygon.io
+response) after `base_seconds`. A `tail_rate` share of requests is delayed by `tail_seconds`
+instead, and an `error_rate` share gets an HTTP 503. A `hang_rate` share is held for
+`hang_seconds`, long enough for the client to time out. The faults can be changed while the
+server runs, either with `server.configure(...)` or with `GET /__faults?error_rate=1`.
+
+Run from `src/` to point the tools at it:
+
+    python -m benchmarks.fault_stub_server --port 8900 --tail-rate 0.05
+    WEATHER_API_BASE_URL=http://127.0.0.1:8900 POLYGONE_BASE_URL=http://127.0.0.1:8900 chainlit run app.py
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+DEFAULT_FAULTS = {
+    "base_seconds": 0.02,
+    "tail_rate": 0.0,
+    "tail_seconds": 1.0,
+    "error_rate": 0.0,
+    "hang_rate": 0.0,
+    "hang_seconds": 5.0,
+}
+
+
+class FaultStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # the default backlog of 5 drops connections under concurrent (hedged) load
+
+    def __init__(self, port=0, **faults):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.faults = dict(DEFAULT_FAULTS, **faults)
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def configure(self, **faults):
+        with self._lock:
+            self.faults.update(faults)
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def next_fault(self):
+        """
+        Counts a request and draws its fault: ("ok" | "error", delay in seconds).
+        """
+        with self._lock:
+            self.requests += 1
+            faults = dict(self.faults)
+        roll = random.random()
+        if roll < faults["error_rate"]:
+            return "error", faults["base_seconds"]
+        roll -= faults["error_rate"]
+        if roll < faults["hang_rate"]:
+            return "ok", faults["hang_seconds"]
+        roll -= faults["hang_rate"]
+        if roll < faults["tail_rate"]:
+            return "ok", faults["tail_seconds"]
+        return "ok", faults["base_seconds"]
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/__faults":
+            self.server.configure(**{key: float(value) for key, value in parse_qsl(url.query)})
+            return self._reply(200, self.server.faults)
+
+        outcome, delay = self.server.next_fault()
+        time.sleep(delay)
+        if outcome == "error":
+            return self._reply(503, {"error": "injected fault"})
+        query = dict(parse_qsl(url.query))
+        self._reply(200, {
+            "location": {"name": query.get("q", "stub")},
+            "current": {"temp_c": 20.0, "condition": {"text": "Sunny"}},
+            "results": [{"title": f"Stub news for {query.get('ticker', 'stub')}"}],
+        })
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client timed out or its hedge won
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8900)
+    for name, default in DEFAULT_FAULTS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=float, default=default)
+    args = vars(parser.parse_args())
+    server = FaultStubServer(args.pop("port"), **args)
+    print(f"Fault stub server on {server.url} with {server.faults}")
+    server.serve_forever()
@@ -0,0 +1,108 @@
+"""
+Benchmark of the metrics hot path (`runtime/metrics.py`).
+
+Threads increment a labeled counter and observe a labeled histogram in a tight loop, through
+the sharded (per-thread) metrics and through a single-lock baseline. The report shows the cost
+per update and checks that no update was lost. A churn check then updates a counter from many
+short-lived threads, as the AnyIO worker threads behind Chainlit do, and checks that the shards
+of exited threads are released without losing their counts (exit status 1 otherwise).
+
+Run from `src/`:
+
+    python -m benchmarks.metrics_bench --updates 200000 --threads 1 4 8
+"""
+
+import argparse
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+from runtime.metrics import LATENCY_BUCKETS, Registry
+
+
+class LockedHistogram:
+    """
+    Baseline: one shared set of bucket counts behind one lock.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self._counts[bisect_left(self._buckets, value)] += 1
+            self._sum += value
+
+
+class LockedCounter:
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+def run(threads, updates, counter, histogram):
+    """
+    Returns the nanoseconds per (increment + observation) with `threads` threads sharing `updates`.
+    """
+    per_thread = updates // threads
+
+    def work():
+        for i in range(per_thread):
+            counter.inc()
+            histogram.observe((i % 100) / 100)
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return (time.perf_counter() - started) / (per_thread * threads) * 1e9
+
+
+def thread_churn(threads):
+    """
+    Increments a counter once from each of `threads` short-lived threads.
+    Returns the counter value and the number of shards still held.
+    """
+    counter = Registry().counter("churn_total", "Churn counter.", ["tool"]).labels("churn")
+    for _ in range(threads):
+        worker = threading.Thread(target=counter.inc)
+        worker.start()
+        worker.join()
+    return counter.value(), len(counter._shards._shards)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--updates", type=int, default=200_000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--churn-threads", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"updates={args.updates}")
+    print(f"{'threads':>7} {'sharded ns':>10} {'locked ns':>9} {'lost updates':>12}")
+    for threads in args.threads:
+        registry = Registry()
+        counter = registry.counter("bench_total", "Benchmark counter.", ["tool"]).labels("bench")
+        histogram = registry.histogram("bench_seconds", "Benchmark histogram.", ["tool"]).labels("bench")
+        sharded = run(threads, args.updates, counter, histogram)
+        expected = args.updates // threads * threads
+        lost = expected - counter.value() + expected - histogram.value()["count"]
+        locked = run(threads, args.updates, LockedCounter(), LockedHistogram())
+        print(f"{threads:>7} {sharded:>10.0f} {locked:>9.0f} {int(lost):>12}")
+
+    value, shards = thread_churn(args.churn_threads)
+    ok = value == args.churn_threads and shards <= 1
+    print(f"\nthread churn: {args.churn_threads} threads, counter={value:.0f}, shards held={shards}  "
+          f"[{'ok' if ok else 'FAILED'}]")
+    sys.exit(0 if ok else 1)
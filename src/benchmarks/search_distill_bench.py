@@ -0,0 +1,84 @@
+"""
+Benchmark of the Serper result distillation (`search/distiller.py`).
+
+For every fixture in `benchmarks/fixtures/serper/` the raw response body, as the SearchAgent
+used to receive it, is compared with the distilled output. Both are measured with the same
+token estimate. Time per distillation and the cache-hit path are also reported.
+
+The bundled fixtures follow Serper's response schema. Record real responses with:
+
+    python -m benchmarks.search_distill_bench --record "tesla stock news"
+
+Run from `src/`:
+
+    python -m benchmarks.search_distill_bench --budget 400
+"""
+
+import argparse
+import glob
+import http.client
+import json
+import os
+import re
+import time
+
+from cache.ttl_cache import TTLCache
+from search.distiller import DEFAULT_TOKEN_BUDGET, distill, estimate_tokens, normalize_query
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "serper")
+
+
+def record(query):
+    """
+    Queries Serper (SERPER_SEARCH_API must be set) and saves the response as a fixture.
+    """
+    conn = http.client.HTTPSConnection("google.serper.dev", timeout=10)
+    conn.request("POST", "/search", json.dumps({"q": query}),
+                 {"X-API-KEY": os.environ["SERPER_SEARCH_API"], "Content-Type": "application/json"})
+    body = json.loads(conn.getresponse().read())
+    path = os.path.join(FIXTURES_DIR, re.sub(r"\W+", "_", normalize_query(query)).strip("_") + ".json")
+    with open(path, "w") as f:
+        json.dump(body, f, indent=2)
+    print(f"Recorded {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget", type=int, default=DEFAULT_TOKEN_BUDGET)
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--record", metavar="QUERY")
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record)
+        raise SystemExit
+
+    print(f"token budget={args.budget}")
+    print(f"{'fixture':<42} {'raw tok':>7} {'distilled':>9} {'saved':>6} {'ms/distill':>10} {'us/cache hit':>12}")
+    total_raw = total_distilled = 0
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.json"))):
+        with open(path) as f:
+            response = json.load(f)
+        query = response.get("searchParameters", {}).get("q", "")
+        raw = json.dumps(response)  # the body as Serper sends it
+
+        started = time.perf_counter()
+        for _ in range(args.repeats):
+            distilled = distill(json.loads(raw), query, args.budget)
+        distill_ms = (time.perf_counter() - started) * 1000 / args.repeats
+
+        cache = TTLCache("bench", ttl=3600)
+        cache.get_or_fetch((normalize_query(query),), lambda q: distilled)
+        started = time.perf_counter()
+        for _ in range(args.repeats):
+            cache.get_or_fetch((normalize_query(query.upper()),), lambda q: distilled)
+        hit_us = (time.perf_counter() - started) * 1e6 / args.repeats
+
+        raw_tokens, distilled_tokens = estimate_tokens(raw), estimate_tokens(distilled)
+        total_raw += raw_tokens
+        total_distilled += distilled_tokens
+        name = os.path.splitext(os.path.basename(path))[0]
+        print(f"{name:<42} {raw_tokens:>7} {distilled_tokens:>9} {1 - distilled_tokens / raw_tokens:>6.0%} "
+              f"{distill_ms:>10.3f} {hit_us:>12.1f}")
+    if total_raw:
+        print(f"{'total':<42} {total_raw:>7} {total_distilled:>9} {1 - total_distilled / total_raw:>6.0%}")
@@ -0,0 +1,177 @@
+"""
+Benchmark of the composite stock snapshot tool (`tools/StockSnapshot_tool.py`).
+
+Stock questions are replayed from StockAgent transcripts in `benchmarks/fixtures/agent/`, one
+per question and toolset: `per_source` (Yahoo Finance and Polygon news tools only) and
+`snapshot` (the StockAgent's tools, snapshot included). Every transcript step is one LLM turn,
+simulated by a sleep, and its tool call runs against stub upstreams with the production fetch
+paths (Yahoo history then info in one tool call; the snapshot's market data and news
+concurrently through the real `build_snapshot`). No API keys are needed. The report shows LLM
+turns, upstream wait and wall-clock time per question.
+
+The bundled transcripts follow the recorded format. Record real ones (API keys needed) with:
+
+    python -m benchmarks.stock_snapshot_bench --record "How is NVDA doing and why?" --toolset per_source
+
+Run from `src/`:
+
+    python -m benchmarks.stock_snapshot_bench --llm-seconds 1.0
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import time
+from collections import defaultdict
+
+from analytics.snapshot import build_snapshot
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "agent")
+TOOLSETS = {
+    "per_source": ["Fetch Yahoo Finance Data", "Fetch Polygon News"],
+    "snapshot": ["Fetch stock snapshot", "Fetch Yahoo Finance Data", "Fetch Polygon News"],
+}
+UPSTREAM_SECONDS = {"history": 0.35, "info": 0.45, "news": 0.30}  # typical latencies per request
+
+STUB_INFO = {"longName": "NVIDIA Corporation", "currentPrice": 131.2, "previousClose": 128.9,
+             "volume": 212_000_000, "marketCap": 3_210_000_000_000, "trailingPE": 52.1}
+STUB_NEWS = [{"published_utc": "2025-01-02T14:00:00Z", "title": "Chip demand lifts NVIDIA",
+              "publisher": {"name": "Stub Wire"}}]
+
+
+class SimulatedAgent:
+    """
+    Counts LLM turns and sleeps for each of them.
+    """
+
+    def __init__(self, llm_seconds):
+        self.llm_seconds = llm_seconds
+        self.turns = 0
+
+    def turn(self):
+        self.turns += 1
+        time.sleep(self.llm_seconds)
+
+
+def history(ticker):
+    time.sleep(UPSTREAM_SECONDS["history"])
+    return "Datetime  Close  Volume\n...   131.2  1200000"
+
+
+def info(ticker):
+    time.sleep(UPSTREAM_SECONDS["info"])
+    return STUB_INFO
+
+
+def news(ticker):
+    time.sleep(UPSTREAM_SECONDS["news"])
+    return STUB_NEWS
+
+
+def market(ticker):
+    # Same requests as fetch_yahoo_finance_data: the history, then the info
+    prices = history(ticker)
+    return info(ticker), prices
+
+
+# Stub of each tool, by tool name, called with the tool input of a transcript step
+TOOLS = {
+    "Fetch Yahoo Finance Data": lambda args: market(args["ticker"]),
+    "Fetch Polygon News": lambda args: news(args["ticker"]),
+    "Fetch stock snapshot": lambda args: build_snapshot(args["ticker"], market, news),
+}
+
+
+def load_transcripts():
+    """
+    Returns the fixture transcripts grouped by question: {question: {toolset: steps}}.
+    """
+    transcripts = defaultdict(dict)
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.json"))):
+        with open(path) as f:
+            transcript = json.load(f)
+        transcripts[transcript["question"]][transcript["toolset"]] = transcript["steps"]
+    return transcripts
+
+
+def replay(steps, agent):
+    """
+    Replays a transcript: one LLM turn per step, followed by the step's tool call if any.
+    """
+    for step in steps:
+        agent.turn()
+        if "tool" in step:
+            TOOLS[step["tool"]](json.loads(step["tool_input"]))
+
+
+def run(steps, llm_seconds, repeats):
+    """
+    Returns the LLM turns and the mean wall-clock and upstream seconds per question.
+    """
+    agent = SimulatedAgent(llm_seconds)
+    started = time.perf_counter()
+    for _ in range(repeats):
+        replay(steps, agent)
+    wall = (time.perf_counter() - started) / repeats
+    turns = agent.turns / repeats
+    return turns, wall, wall - turns * llm_seconds
+
+
+def record(question, toolset):
+    """
+    Runs the StockAgent on `question` with the tools of `toolset` (API keys must be set)
+    and saves its steps as a transcript fixture.
+    """
+    from crewai import Task
+    from agents.Multi_agents import StockAgents
+
+    agent = StockAgents.StockAgent()
+    steps = []
+
+    def on_step(step):
+        if hasattr(step, "tool"):
+            steps.append({"thought": step.thought, "tool": step.tool, "tool_input": step.tool_input})
+        else:
+            steps.append({"thought": step.thought, "final_answer": step.output})
+
+    agent.step_callback = on_step
+    tools = [tool for tool in agent.tools if tool.name in TOOLSETS[toolset]]
+    Task(description=question, expected_output="A concise answer to the question.", agent=agent,
+         tools=tools).execute_sync()
+    name = re.sub(r"\W+", "_", question.lower()).strip("_")
+    path = os.path.join(FIXTURES_DIR, f"{name}.{toolset}.json")
+    with open(path, "w") as f:
+        json.dump({"question": question, "toolset": toolset, "steps": steps}, f, indent=2)
+    print(f"Recorded {path} ({len(steps)} steps)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--llm-seconds", type=float, default=1.0, help="simulated latency of one LLM turn")
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--record", metavar="QUESTION")
+    parser.add_argument("--toolset", choices=sorted(TOOLSETS), default="snapshot")
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record, args.toolset)
+        raise SystemExit
+
+    print(f"llm turn={args.llm_seconds}s upstream={UPSTREAM_SECONDS} repeats={args.repeats}")
+    print(f"{'question':<66} {'toolset':>10} {'LLM turns':>9} {'upstream s':>10} {'wall s':>7}")
+    totals = defaultdict(float)
+    for question, toolsets in load_transcripts().items():
+        baseline = None
+        for toolset in ("per_source", "snapshot"):
+            if toolset not in toolsets:
+                continue
+            turns, wall, upstream = run(toolsets[toolset], args.llm_seconds, args.repeats)
+            baseline = baseline or wall
+            totals[toolset] += wall
+            print(f"{question:<66} {toolset:>10} {turns:>9.0f} {upstream:>10.2f} {wall:>7.2f}"
+                  f"  ({wall / baseline:.0%} of per-source)")
+    if totals["per_source"]:
+        print(f"{'all questions':<66} {'snapshot':>10} {'':>9} {'':>10} {totals['snapshot']:>7.2f}"
+              f"  ({totals['snapshot'] / totals['per_source']:.0%} of per-source)")
@@ -0,0 +1,176 @@
+"""
+Checks circuit breakers, stale fallback and hedged requests against the fault stub server.
+
+The guarded fetch below runs through the same `runtime.upstream.guarded` decorator and
+`TTLCache` as the tool fetch functions, using urllib, so no API keys are needed:
+
+1. Tail latency: some responses are held back. The script prints latency percentiles
+   without hedging and with hedging after the p95. Each run starts with unmeasured warm-up
+   calls: until an upstream has MIN_SAMPLES latencies, the hedge delay is DEFAULT_DELAY (1 s,
+   longer than the injected tail), so the first calls are never hedged. Measured from a cold
+   start, those calls alone put the p99 of a 200-call run at the full tail (~300 ms). A hedged
+   call can still be slow when both attempts hit the tail: with 5% of the calls hedged, ~0.35%
+   of them, i.e. ~1.5 calls in 400 and more than the 1% a p99 allows in about one 400-call run
+   in 17. The p99 check therefore runs 1000 calls (~3.5 expected, 10 allowed).
+2. Outage: every response fails or hangs. The breaker opens, calls fail fast and the cache
+   serves stale data; after recovery, a probe closes the breaker again.
+
+Each scenario returns the checks of its expected outcome, which `tests/test_upstream_resilience.py`
+asserts under pytest. Run as a script, it prints the measurements and checks and exits with
+status 1 if any check fails.
+
+Run from `src/`:
+
+    python -m benchmarks.upstream_resilience --calls 1000 --tail-rate 0.05 --metrics-json resilience.json
+"""
+
+import argparse
+import json
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fault_stub_server import FaultStubServer
+from cache.ttl_cache import TTLCache
+from runtime import metrics
+from runtime.circuit_breaker import CLOSED, CircuitOpen
+from runtime.hedging import MAX_HEDGE_RATIO, MIN_SAMPLES
+from runtime.upstream import FAILURE_THRESHOLD, breaker, guarded, hedger
+
+CLIENT_TIMEOUT = 0.5  # seconds, the stand-in for call_timeout() in the tools
+
+
+def report(checks):
+    """
+    Prints the outcome of (passed, description) checks and returns the descriptions of failed ones.
+    """
+    for passed, description in checks:
+        print(f"   [{'ok' if passed else 'FAILED'}] {description}")
+    return [description for passed, description in checks if not passed]
+
+
+def make_fetch(base_url, upstream, hedge):
+    @guarded(upstream, idempotent=True, hedge=hedge)
+    def fetch(city):
+        with urllib.request.urlopen(f"{base_url}/v1/current.json?q={city}", timeout=CLIENT_TIMEOUT) as response:
+            return json.loads(response.read())
+    return fetch
+
+
+def percentile(latencies, fraction):
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def percentiles(latencies):
+    pick = lambda fraction: percentile(latencies, fraction) * 1000
+    return f"p50={pick(0.50):7.1f}ms p95={pick(0.95):7.1f}ms p99={pick(0.99):7.1f}ms max={max(latencies) * 1000:7.1f}ms"
+
+
+def tail_latency(server, calls, concurrency, warmup):
+    """
+    Measures latency without and with hedging and returns the (passed, description) checks.
+    """
+    tail_seconds = server.faults['tail_seconds']
+    print(f"\n1. Tail latency ({calls} calls after {warmup} warm-up calls, "
+          f"{server.faults['tail_rate']:.0%} delayed by {tail_seconds}s)")
+    measured = {}
+    for hedge in (False, True):
+        upstream = f"stub_tail_{'hedged' if hedge else 'plain'}"
+        fetch = make_fetch(server.url, upstream, hedge)
+
+        def timed_call(i):
+            started = time.perf_counter()
+            fetch(f"city{i}")
+            return time.perf_counter() - started
+
+        with ThreadPoolExecutor(concurrency) as pool:
+            list(pool.map(timed_call, range(warmup)))
+            latencies = list(pool.map(timed_call, range(warmup, warmup + calls)))
+        stats = hedger(upstream).stats()
+        label = "hedged" if hedge else "plain"
+        print(f"   {label:>7}: {percentiles(latencies)}  hedge_rate={stats['hedge_rate']:.1%} hedge_wins={stats['hedge_wins']}")
+        measured[label] = (latencies, stats)
+
+    (plain, _), (hedged, stats) = measured["plain"], measured["hedged"]
+    return [
+        (percentile(plain, 0.99) >= tail_seconds, "without hedging the injected tail reaches the p99"),
+        (percentile(hedged, 0.95) < tail_seconds / 2, "hedging cuts the p95 below half the injected tail"),
+        (percentile(hedged, 0.99) < tail_seconds, "hedging cuts the p99 below the injected tail"),
+        (stats["hedge_rate"] <= MAX_HEDGE_RATIO, f"at most {MAX_HEDGE_RATIO:.0%} of the calls are hedged"),
+    ]
+
+
+def outage(server, calls, reset_seconds):
+    """
+    Runs an outage and the recovery after it, and returns the (passed, description) checks.
+    """
+    print(f"\n2. Outage ({calls} calls while every response hangs past the {CLIENT_TIMEOUT}s client timeout)")
+    upstream = "stub_outage"
+    circuit = breaker(upstream)
+    circuit.reset_timeout = reset_seconds
+    cache = TTLCache(upstream, ttl=0.01, stale_ttl=3600)
+    fetch = make_fetch(server.url, upstream, hedge=False)
+
+    cache.get_or_fetch(("paris",), fetch)  # healthy: the entry that will be served stale
+    time.sleep(0.02)
+    server.configure(hang_rate=1.0, hang_seconds=2 * CLIENT_TIMEOUT)
+    requests_before = server.requests
+
+    latencies, timeouts, fast_fails = [], 0, 0
+    for _ in range(calls):
+        started = time.perf_counter()
+        cache.get_or_fetch(("paris",), fetch)
+        latencies.append(time.perf_counter() - started)
+        try:
+            fetch("berlin")  # nothing cached: must fail
+        except CircuitOpen:
+            fast_fails += 1
+        except Exception:
+            timeouts += 1
+    stale = cache.stats()["stale_hits"]
+    print(f"   stale answers: {stale}/{calls}; uncached calls: {timeouts} timed out, {fast_fails} failed fast; "
+          f"upstream requests: {server.requests - requests_before} of {2 * calls} calls")
+    print(f"   stale-answer latency: {percentiles(latencies)}")
+    print(f"   breaker: {circuit.stats()}")
+    checks = [
+        (stale == calls, "every cached call is answered with stale data"),
+        (server.requests - requests_before <= FAILURE_THRESHOLD,
+         f"the upstream receives at most {FAILURE_THRESHOLD} requests before the breaker opens"),
+        (fast_fails >= calls - FAILURE_THRESHOLD, "once open, the breaker fails uncached calls fast"),
+        (percentile(latencies, 0.5) < 0.01, "the median stale answer takes under 10 ms"),
+    ]
+
+    server.configure(hang_rate=0.0)
+    time.sleep(reset_seconds)
+    fetch("berlin")  # the half-open probe succeeds
+    print(f"   after recovery: {circuit.stats()}")
+    checks.append((circuit.stats()["state"] == CLOSED, "a successful probe closes the breaker"))
+    return checks
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=2 * MIN_SAMPLES, help="unmeasured calls per run")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--tail-rate", type=float, default=0.05)
+    parser.add_argument("--tail-seconds", type=float, default=0.3)
+    parser.add_argument("--reset-seconds", type=float, default=1.0)
+    parser.add_argument("--metrics-json", help="write the upstream and cache metrics to this JSON file")
+    args = parser.parse_args()
+
+    server = FaultStubServer(tail_rate=args.tail_rate, tail_seconds=args.tail_seconds).start()
+    try:
+        failures = report(tail_latency(server, args.calls, args.concurrency, args.warmup))
+        server.configure(tail_rate=0.0)
+        failures += report(outage(server, 50, args.reset_seconds))
+    finally:
+        server.shutdown()
+    if args.metrics_json:
+        metrics.REGISTRY.dump_json(args.metrics_json)
+        print(f"\nMetrics written to {args.metrics_json}")
+    if failures:
+        print(f"\n{len(failures)} check(s) failed")
+        sys.exit(1)
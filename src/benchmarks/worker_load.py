@@ -0,0 +1,163 @@
+"""
+Load test of the execution modes: in-process threads vs. the split deployment (`workers/`).
+
+A stub workflow stands in for `create_workflow()` so the test needs no API keys. Each job makes
+a few simulated LLM calls: a network wait (sleep) followed by CPU work holding the GIL (prompt
+building, JSON parsing and formatting of a response-sized document), then answers with a
+realistically sized text. A fixed number of clients send jobs one after the other:
+
+- in-process: each client runs the workflow in a thread of this process, as `app.py` does,
+  so all jobs share one GIL.
+- split: each client submits its job to the real job queue and streams the progress and token
+  events back from the worker pool, as `app.stream_from_workers` does.
+
+Throughput and job latency (p50, p95) are reported per mode and worker count, so the numbers
+include both GIL contention and the queue's round trips per token.
+
+Run from `src/`:
+
+    python -m benchmarks.worker_load --queue memory:// --jobs 200 --clients 16 --workers 1 2 4 8
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+
+from workers.job_queue import make_queue
+from workers.worker import WorkerPool
+
+STUB_LLM_CALLS = 3  # LLM calls per job (categorization, agent turns)
+STUB_IO_SECONDS = 0.05  # simulated network wait per LLM call
+STUB_CPU_SECONDS = 0.01  # CPU time per LLM call, spent holding the GIL
+STUB_ANSWER_CHARS = 1500  # length of the answer, streamed token by token
+
+
+class StubWorkflow:
+    """
+    Mimics the `stream` interface of the compiled StateGraph.
+    """
+
+    def stream(self, inputs, config=None, stream_mode="updates"):
+        yield {"entryNode": {"category": "other"}}
+        for _ in range(STUB_LLM_CALLS):
+            time.sleep(STUB_IO_SECONDS)
+            burn_cpu(STUB_CPU_SECONDS)
+        answer = f"Stub answer to: {inputs['query']} " + "lorem ipsum " * (STUB_ANSWER_CHARS // 12)
+        yield {"SearchNode": {"messages": inputs["messages"] + [answer[:STUB_ANSWER_CHARS]]}}
+
+
+def create_stub_workflow():
+    return StubWorkflow()
+
+
+def burn_cpu(seconds):
+    """
+    Spends `seconds` of this thread's CPU time serializing and parsing a response-sized document.
+    """
+    document = {"choices": [{"message": {"content": "token " * 200}}], "usage": {"total_tokens": 400}}
+    stop_at = time.thread_time() + seconds
+    while time.thread_time() < stop_at:
+        json.loads(json.dumps(document))
+
+
+def run_inprocess(jobs, clients):
+    """
+    Runs `jobs` jobs from `clients` threads of this process. Returns (jobs per second, latencies).
+    """
+    workflow = create_stub_workflow()
+
+    def run_job(job_id):
+        inputs = {"query": f"question {job_id}", "messages": [f"question {job_id}"]}
+        messages = inputs["messages"]
+        for update in workflow.stream(inputs):
+            for values in update.values():
+                messages = values.get("messages") or messages
+        for char in str(messages[-1]):  # streamed to the client one character at a time
+            pass
+
+    return _run_clients(jobs, clients, run_job)
+
+
+def run_split(queue_url, jobs, clients, processes, threads):
+    """
+    Runs `jobs` jobs from `clients` threads through a fresh pool of `processes` workers.
+    Returns (jobs per second, latencies).
+    """
+    job_queue = make_queue(queue_url)
+    pool = WorkerPool(job_queue, processes, threads, "benchmarks.worker_load:create_stub_workflow").start()
+
+    def run_job(job_id):
+        job_queue.submit(job_id, {"query": f"question {job_id}", "deadline": None})
+        while True:
+            events = job_queue.poll_events(job_id, timeout=1.0)
+            if any(event["type"] in ("done", "error") for event in events):
+                return
+
+    try:
+        # Warm-up: wait until every worker process has started and served a job
+        _run_clients(processes * threads, processes * threads, run_job)
+        return _run_clients(jobs, clients, run_job)
+    finally:
+        pool.stop()
+
+
+def _run_clients(jobs, clients, run_job):
+    """
+    Runs `jobs` jobs with `run_job(job_id)` from `clients` threads, each sending its next job
+    once the previous one is answered.
+    """
+    remaining = iter(range(jobs))
+    lock = threading.Lock()
+    latencies = []
+
+    def client():
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            started = time.perf_counter()
+            run_job(uuid.uuid4().hex)
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return jobs / (time.perf_counter() - started), latencies
+
+
+def report(label, processes, throughput, latencies, baseline):
+    p50 = statistics.median(latencies) * 1000
+    p95 = statistics.quantiles(latencies, n=20)[-1] * 1000
+    print(f"{label:>10} {processes:>9} {throughput:>8.1f} {throughput / baseline:>7.2f}x {p50:>7.0f} {p95:>7.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queue", default="memory://", help="memory://, sqlite:///path or redis://...")
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--clients", type=int, default=16, help="concurrent requests")
+    parser.add_argument("--threads", type=int, default=4, help="threads per worker process")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    print(f"queue={args.queue} jobs={args.jobs} clients={args.clients} threads/process={args.threads}")
+    print(f"job: {STUB_LLM_CALLS} LLM calls of {STUB_IO_SECONDS}s wait + {STUB_CPU_SECONDS}s CPU, "
+          f"{STUB_ANSWER_CHARS}-char answer")
+    print(f"{'mode':>10} {'processes':>9} {'jobs/s':>8} {'speedup':>8} {'p50 ms':>7} {'p95 ms':>7}")
+    baseline, latencies = run_inprocess(args.jobs, args.clients)
+    report("in-process", 1, baseline, latencies, baseline)
+    for processes in args.workers:
+        queue_url = args.queue
+        if queue_url == "sqlite:///":
+            queue_url += os.path.join(tempfile.mkdtemp(), "jobs.db")
+        throughput, latencies = run_split(queue_url, args.jobs, args.clients, processes, args.threads)
+        report("split", processes, throughput, latencies, baseline)
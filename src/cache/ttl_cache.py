@@ -0,0 +1,207 @@
+"""
+Subfolder: cache
+Role: In-process caching of upstream data (market data, news, weather) shared by every request
+served by a process, plus the background warmer that keeps the hottest entries fresh.
+
+File: ttl_cache.py
+Purpose: A thread-safe TTL cache that also tracks how often each key is requested, so the
+warmer can learn which keys are hot, and whether hits were served by warmer-filled entries.
+Only requests that got data (hits and successful fetches) count, so keys that always fail never
+rank as hot. Request counts decay with a half-life of CACHE_DEMAND_HALF_LIFE_SECONDS (default one hour), so
+a key requested a few times stays known for hours while the ranking still follows traffic.
+Expired entries are kept for a stale window and served when the upstream fails or its circuit
+breaker is open.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from runtime import metrics
+
+SOURCE_USER = "user"
+SOURCE_WARMER = "warmer"
+
+DEMAND_HALF_LIFE = float(os.environ.get("CACHE_DEMAND_HALF_LIFE_SECONDS", "3600"))
+MIN_DEMAND = 0.05  # decayed request count under which a key is forgotten
+
+CACHE_LOOKUPS = metrics.counter("cache_lookups_total", "Cache lookups by result (hit, warm_hit, miss, stale).",
+                                ["cache", "result"])
+CACHE_UPSTREAM_CALLS = metrics.counter("cache_upstream_calls_total", "Upstream fetches made to fill a cache.",
+                                       ["cache", "source"])
+CACHE_ENTRIES = metrics.gauge("cache_entries", "Entries held by a cache.", ["cache"])
+
+
+class TTLCache:
+    """
+    A bounded, thread-safe cache whose entries expire `ttl` seconds after being stored.
+    Keys are tuples of the arguments passed to the cached fetch function.
+    An expired entry can still be served for `stale_ttl` seconds when a refetch fails.
+    """
+
+    def __init__(self, name, ttl, max_entries=1024, stale_ttl=0, demand_half_life=DEMAND_HALF_LIFE):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.demand_half_life = demand_half_life
+        self._entries = OrderedDict()  # key -> (value, expires_at, source)
+        self._key_locks = {}  # key -> [lock, threads holding or waiting for it]
+        self._demand = {}  # key -> (decayed request count, time of that count)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.warm_hits = 0  # hits served by entries the warmer stored
+        self.misses = 0
+        self.stale_hits = 0  # stale entries served because the upstream failed
+        self.upstream_calls = {SOURCE_USER: 0, SOURCE_WARMER: 0}
+        self._lookups = {result: CACHE_LOOKUPS.labels(name, result) for result in ("hit", "warm_hit", "miss", "stale")}
+
+    def get(self, key):
+        """
+        Returns the cached value for `key`, or None if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.time():
+                self.misses += 1
+                self._lookups["miss"].inc()
+                return None
+            self._count_demand(key)
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if entry[2] == SOURCE_WARMER:
+                self.warm_hits += 1
+            self._lookups["warm_hit" if entry[2] == SOURCE_WARMER else "hit"].inc()
+            return entry[0]
+
+    def set(self, key, value, source=SOURCE_USER):
+        with self._lock:
+            self._entries[key] = (value, time.time() + self.ttl, source)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            CACHE_ENTRIES.labels(self.name).set(len(self._entries))
+
+    def get_or_fetch(self, key, fetch):
+        """
+        Returns the cached value for `key`, calling `fetch(*key)` on a miss.
+        Concurrent misses on the same key share a single upstream call.
+        If `fetch` raises, a stale entry within `stale_ttl` is returned instead;
+        without one, the exception propagates and nothing is cached.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._key_lock(key):
+            value = self._peek(key)
+            if value is not None:
+                return value
+            try:
+                value = fetch(*key)
+            except Exception:
+                # Counted in cache_lookups_total{result="stale"}: no log line per request during an outage
+                stale = self._stale(key)
+                if stale is None:
+                    raise
+                return stale
+            self._count_upstream(SOURCE_USER)
+            self.set(key, value)
+            with self._lock:
+                self._count_demand(key)
+            return value
+
+    def refresh(self, key, fetch):
+        """
+        Fetches `key` again on behalf of the warmer and stores the result.
+        """
+        with self._key_lock(key):
+            value = fetch(*key)
+            self._count_upstream(SOURCE_WARMER)
+            self.set(key, value, source=SOURCE_WARMER)
+
+    def time_to_live(self, key):
+        """
+        Returns the seconds left before `key` expires (0 if missing or expired).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return max(0.0, entry[1] - time.time()) if entry else 0.0
+
+    def hot_keys(self, top_n):
+        """
+        Returns the `top_n` most requested keys, by request count decayed over time,
+        and forgets the keys not requested for many half-lives.
+        """
+        with self._lock:
+            now = time.time()
+            demand = {key: self._decayed(key, now) for key in self._demand}
+            self._demand = {key: self._demand[key] for key, count in demand.items() if count >= MIN_DEMAND}
+            return sorted(self._demand, key=demand.get, reverse=True)[:top_n]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "warm_hits": self.warm_hits,
+                "misses": self.misses,
+                "stale_hits": self.stale_hits,
+                "upstream_calls": dict(self.upstream_calls),
+            }
+
+    def _count_demand(self, key):
+        """
+        Counts one request served with data for `key` (the cache lock must be held).
+        """
+        now = time.time()
+        self._demand[key] = (self._decayed(key, now) + 1, now)
+        if len(self._demand) > 4 * self.max_entries:
+            # Keep only the most requested keys
+            ranked = sorted(self._demand, key=lambda k: self._decayed(k, now), reverse=True)[:self.max_entries]
+            self._demand = {k: self._demand[k] for k in ranked}
+
+    def _decayed(self, key, now):
+        """
+        Returns the request count of `key` decayed to `now` (the cache lock must be held).
+        """
+        count, counted_at = self._demand.get(key, (0.0, now))
+        return count * 0.5 ** ((now - counted_at) / self.demand_half_life)
+
+    def _peek(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry and entry[1] > time.time() else None
+
+    def _stale(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] + self.stale_ttl <= time.time():
+                return None
+            self.stale_hits += 1
+            self._lookups["stale"].inc()
+            return entry[0]
+
+    @contextmanager
+    def _key_lock(self, key):
+        """
+        Holds the lock serializing the fetches of `key`. The lock only exists while a thread
+        holds or waits for it, so failed and one-off keys leave nothing behind.
+        """
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            key_lock[1] += 1
+        try:
+            with key_lock[0]:
+                yield
+        finally:
+            with self._lock:
+                key_lock[1] -= 1
+                if key_lock[1] == 0:
+                    del self._key_locks[key]
+
+    def _count_upstream(self, source):
+        with self._lock:
+            self.upstream_calls[source] += 1
+        CACHE_UPSTREAM_CALLS.labels(self.name, source).inc()
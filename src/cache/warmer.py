@@ -0,0 +1,160 @@
+"""
+This module defines the background cache warmer.
+
+Every cycle the warmer picks, for each registered cache, the keys worth keeping warm: the
+top-N keys of recent traffic plus a configured watchlist. Any of those missing from the cache
+or expiring before the next cycle is refreshed ahead of time, soonest-expiring first, until the cycle's
+upstream-call budget is spent. User requests for those keys then hit warm data. A key whose
+refresh failed is skipped for one interval, then twice as long after each further failure (up to
+MAX_BACKOFF_CYCLES intervals), so a failing key cannot take the budget of working ones.
+
+Configuration (environment variables):
+- CACHE_WARMER_ENABLED: "1" to start the warmer with the app or worker process.
+- WARMER_INTERVAL_SECONDS: seconds between cycles (default 30).
+- WARMER_TOP_N: hot keys considered per cache (default 10).
+- WARMER_BUDGET_PER_CYCLE: maximum upstream calls per cycle, all caches included (default 20).
+  The budget is per host: each process owns its caches and runs its own warmer, so a pool of N
+  worker processes gives each warmer 1/N of it.
+- WARMER_WATCHLIST_TICKERS / WARMER_WATCHLIST_CITIES: comma-separated keys always kept warm.
+"""
+
+import os
+import threading
+import time
+
+from runtime import metrics
+
+MAX_BACKOFF_CYCLES = 32  # longest wait before retrying a failing key, in intervals
+
+WARMER_CYCLES = metrics.counter("warmer_cycles_total", "Cache warmer cycles run.")
+WARMER_REFRESHES = metrics.counter("warmer_refreshes_total", "Cache entries refreshed by the warmer, by outcome.",
+                                   ["cache", "outcome"])
+
+
+class CacheWarmer:
+    """
+    Periodically refreshes hot and watchlisted cache entries within an upstream-call budget.
+    """
+
+    def __init__(self, interval=30, top_n=10, budget_per_cycle=20):
+        self.interval = interval
+        self.top_n = top_n
+        self.budget_per_cycle = budget_per_cycle
+        self._targets = []  # (cache, fetch, watchlist keys)
+        self._backoff = {}  # (cache name, key) -> (consecutive failures, time of the next attempt)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.cycles = 0
+        self.upstream_calls = 0
+        self.failures = 0
+
+    def register(self, cache, fetch, watchlist=()):
+        """
+        Keeps `cache` warm by calling `fetch(*key)`; `watchlist` keys are always refreshed.
+        """
+        self._targets.append((cache, fetch, list(watchlist)))
+
+    def run_once(self):
+        """
+        Runs one warming cycle and returns the number of upstream calls it made.
+        """
+        now = time.time()
+        candidates, backoff = [], {}
+        for cache, fetch, watchlist in self._targets:
+            for key in dict.fromkeys(watchlist + cache.hot_keys(self.top_n)):
+                failed = self._backoff.get((cache.name, key))
+                if failed:
+                    backoff[cache.name, key] = failed  # forgotten once the key is neither hot nor watched
+                    if failed[1] > now:
+                        continue
+                # Refresh anything that would expire before the next cycle has a chance to
+                if cache.time_to_live(key) <= self.interval * 1.5:
+                    candidates.append((cache.time_to_live(key), cache, fetch, key))
+        self._backoff = backoff
+
+        # Missing and soonest-expiring entries first
+        candidates.sort(key=lambda candidate: candidate[0])
+        calls = 0
+        for _, cache, fetch, key in candidates[:self.budget_per_cycle]:
+            calls += 1
+            try:
+                cache.refresh(key, fetch)
+                self._backoff.pop((cache.name, key), None)
+                WARMER_REFRESHES.labels(cache.name, "ok").inc()
+            except Exception as e:
+                self.failures += 1
+                failures = self._backoff.get((cache.name, key), (0, 0))[0] + 1
+                wait = self.interval * min(2 ** (failures - 1), MAX_BACKOFF_CYCLES)
+                self._backoff[cache.name, key] = (failures, time.time() + wait)
+                WARMER_REFRESHES.labels(cache.name, "error").inc()
+                print(f"Cache warmer failed to refresh {cache.name} {key}: {e}")
+
+        self.cycles += 1
+        WARMER_CYCLES.inc()
+        self.upstream_calls += calls
+        return calls
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="cache-warmer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+
+    def stats(self):
+        """
+        Returns the warmer's upstream spend and, per cache, how many hits warmed entries served.
+        """
+        caches = {cache.name: cache.stats() for cache, _, _ in self._targets}
+        hits = sum(stats["hits"] for stats in caches.values())
+        warm_hits = sum(stats["warm_hits"] for stats in caches.values())
+        return {
+            "cycles": self.cycles,
+            "upstream_calls": self.upstream_calls,
+            "failures": self.failures,
+            "warm_hit_ratio": warm_hits / hits if hits else 0.0,
+            "caches": caches,
+        }
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            started = time.time()
+            self.run_once()
+            self._stop_event.wait(max(0.0, self.interval - (time.time() - started)))
+
+
+def _env_list(name):
+    return [item.strip() for item in os.environ.get(name, "").split(",") if item.strip()]
+
+
+_default_warmer = None
+
+
+def start_default_warmer(budget_share=1.0):
+    """
+    Starts the warmer for the market-data, news and weather caches if CACHE_WARMER_ENABLED is set.
+    The warmer gets `budget_share` of WARMER_BUDGET_PER_CYCLE (at least one call per cycle).
+    Returns the running warmer (one per process), or None when disabled.
+    """
+    global _default_warmer
+    if _default_warmer is not None or os.environ.get("CACHE_WARMER_ENABLED", "0") != "1":
+        return _default_warmer
+
+    from tools.YahooFinance_tool import fetch_yahoo_finance_data, yahoo_cache
+    from tools.Polygone_tool import fetch_polygon_news, news_cache, news_key
+    from tools.Weather_tool import fetch_weather, location_key, weather_cache
+
+    tickers = [ticker.upper() for ticker in _env_list("WARMER_WATCHLIST_TICKERS")]
+    cities = [location_key(city) for city in _env_list("WARMER_WATCHLIST_CITIES")]
+
+    warmer = CacheWarmer(
+        interval=float(os.environ.get("WARMER_INTERVAL_SECONDS", "30")),
+        top_n=int(os.environ.get("WARMER_TOP_N", "10")),
+        budget_per_cycle=max(1, int(int(os.environ.get("WARMER_BUDGET_PER_CYCLE", "20")) * budget_share)),
+    )
+    warmer.register(yahoo_cache, fetch_yahoo_finance_data, [(ticker, "1d", "1m") for ticker in tickers])
+    warmer.register(news_cache, fetch_polygon_news, [news_key(ticker) for ticker in tickers])
+    warmer.register(weather_cache, fetch_weather, [(city,) for city in cities])
+    _default_warmer = warmer.start()
+    return _default_warmer
@@ -0,0 +1 @@
+# pytest puts this directory on sys.path, so tests import the application packages as the app does
@@ -0,0 +1,116 @@
+"""
+Subfolder: geo
+Role: Offline location data, so place names typed by users resolve locally before any
+upstream weather request is made.
+
+File: gazetteer.py
+Purpose: Resolves a free-form place name to a canonical location (ID, name, country and
+coordinates) from a local index (`cities.csv`). Names are matched case- and accent-insensitively,
+against aliases ("NYC", "München", "Bombay") and, failing that, with typo tolerance ("Pari",
+"Londn"). A country qualifier ("Paris, France", "Paris, FR") must agree with the match; a
+qualifier naming anything else ("Paris, Texas") leaves the name unresolved, and the caller
+falls back to the raw name.
+
+Configuration (environment variables):
+- GAZETTEER_PATH: CSV file to load instead of the bundled `cities.csv` (same columns).
+"""
+
+import csv
+import difflib
+import os
+import re
+import unicodedata
+from functools import lru_cache
+from typing import NamedTuple
+
+GAZETTEER_PATH = os.environ.get("GAZETTEER_PATH", os.path.join(os.path.dirname(__file__), "cities.csv"))
+FUZZY_CUTOFF = 0.85  # difflib similarity needed for a typo match
+FUZZY_MIN_LENGTH = 4  # shorter names must match exactly
+
+# Country names users write that are not in the data file
+COUNTRY_ALIASES = {
+    "usa": "US", "america": "US", "united states of america": "US",
+    "uk": "GB", "britain": "GB", "great britain": "GB", "england": "GB", "scotland": "GB",
+    "holland": "NL", "the netherlands": "NL", "uae": "AE", "korea": "KR", "czech republic": "CZ",
+}
+
+
+class Location(NamedTuple):
+    id: str
+    name: str
+    country_code: str
+    country: str
+    lat: float
+    lon: float
+
+    @property
+    def coordinates(self):
+        """
+        Returns the "lat,lon" form accepted by weather APIs.
+        """
+        return f"{self.lat},{self.lon}"
+
+
+def normalize_name(text):
+    """
+    Folds a place name to lowercase ASCII words: "  São  Paulo " -> "sao paulo".
+    Commas are kept to separate a country qualifier.
+    """
+    folded = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii").lower()
+    return " ".join(re.sub(r"[^a-z0-9,]+", " ", folded).split()).replace(" ,", ",")
+
+
+def _load(path):
+    """
+    Reads the gazetteer and returns `(locations by ID, locations by name or alias, country codes by name)`.
+    """
+    by_id, by_name, countries = {}, {}, dict(COUNTRY_ALIASES)
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            location = Location(row["id"], row["name"], row["country_code"], row["country"],
+                                float(row["lat"]), float(row["lon"]))
+            by_id[location.id] = location
+            for name in [row["name"]] + row["aliases"].split("|"):
+                if name.strip():
+                    by_name.setdefault(normalize_name(name), location)
+            countries[normalize_name(row["country"])] = location.country_code
+            countries[location.country_code.lower()] = location.country_code
+    return by_id, by_name, countries
+
+
+_by_id, _by_name, _countries = _load(GAZETTEER_PATH)
+
+
+def by_id(location_id):
+    """
+    Returns the location with a canonical ID, or None.
+    """
+    return _by_id.get(location_id)
+
+
+@lru_cache(maxsize=4096)
+def resolve(query):
+    """
+    Resolves a place name to its canonical location.
+
+    Returns:
+        Location: The match, or None if the name is unknown or its country qualifier disagrees.
+    """
+    name, _, qualifier = normalize_name(query).partition(",")
+    location = _lookup(name.strip())
+    if location is None or not qualifier.strip():
+        return location
+    # "Paris, Ile-de-France, France": the country is the last part
+    country = qualifier.rsplit(",", 1)[-1].strip()
+    return location if _countries.get(country) == location.country_code else None
+
+
+def _lookup(name):
+    if not name:
+        return None
+    if name in _by_name:
+        return _by_name[name]
+    if len(name) < FUZZY_MIN_LENGTH:
+        return None
+    matches = difflib.get_close_matches(name, _by_name.keys(), n=1, cutoff=FUZZY_CUTOFF)
+    return _by_name[matches[0]] if matches else None
@@ -18,5 +18,9 @@ class AgentState(TypedDict):
     query: str           # The user's input query
     stock: str           # Stock-related information
     news: str            # News-related information
-    city: str            # City name for weather queries
-    stock_list: List[str]  # List of stocks for comparison or analysis
\ No newline at end of file
+    city: List[str]      # City names for weather queries, one entry per city
+    entry_output: str    # Raw categorization output of the entry node, parsed by the parse node
+    stock_list: List[str]  # List of stocks for comparison or analysis
+    category: str        # Category assigned to the query by the entry node
+    deadline: float      # Absolute timestamp by which the request must be answered
+    partial: bool        # True when the answer was cut short by the deadline
@@ -11,6 +11,8 @@ from tasks.stock_task2 import NewsTasks
 from tasks.stock_task3 import CompareTasks
 from tasks.search_task import SearchTasks
 from tasks.weathercheck_task import WeatherTasks
+from runtime.deadline import DeadlineExceeded, deadline_scope, partial_results, run_until_deadline
+from runtime.instrumentation import LLMMetricsCallback, observe_node
 from langchain_openai import AzureChatOpenAI
 import os 
 from dotenv import load_dotenv
@@ -28,7 +30,11 @@ AZURE_OPENAI_ENDPOINT = os.environ['AZURE_OPENAI_ENDPOINT']
 AZURE_OPENAI_DEPLOYMENT_NAME = os.environ['AZURE_OPENAI_DEPLOYMENT_NAME']
 
 # Initialize the language model from OpenAI Azure
-llm = AzureChatOpenAI(azure_deployment=AZURE_OPENAI_DEPLOYMENT_NAME, api_version=AZURE_OPENAI_API_VERSION)
+llm = AzureChatOpenAI(azure_deployment=AZURE_OPENAI_DEPLOYMENT_NAME, api_version=AZURE_OPENAI_API_VERSION,
+                      callbacks=[LLMMetricsCallback(f"azure/{AZURE_OPENAI_DEPLOYMENT_NAME}")])
+
+# Maximum length of each tool output quoted in a partial answer
+PARTIAL_ANSWER_MAX_CHARS = 1500
 
 class Nodes:
     """
@@ -36,6 +42,7 @@ class Nodes:
     Each node runs a specific task based on the input state and returns an updated message list.
     """
 
+    @observe_node("StockNode")
     def StockNode(self, state):
         """
         StockNode:
@@ -47,26 +54,32 @@ class Nodes:
         
         messages = state["messages"]
         
-        if state["stock"]:
-            stockAgent = StockAgents.StockAgent()
-            stockTask = StockTasks.StockAnalaysisTask(stockAgent, state["stock"])
-            result = stockTask.execute_sync()
-            messages.append(result)
-        
-        elif state["news"]:
-            stockAgent = StockAgents.StockAgent()
-            NewsTask = NewsTasks.NewsAnalysisTask(stockAgent, state["news"])
-            result = NewsTask.execute_sync()
-            messages.append(result)
-        
-        elif state["stock_list"]:
-            stockAgent = StockAgents.StockAgent()
-            compareTask = CompareTasks.StockcomparisonTask(stockAgent, state["stock_list"])
-            result = compareTask.execute_sync()
-            messages.append(result)
+        with deadline_scope(state.get("deadline")):
+            try:
+                if state["stock"]:
+                    stockAgent = StockAgents.StockAgent()
+                    stockTask = StockTasks.StockAnalaysisTask(stockAgent, state["stock"])
+                    result = run_until_deadline(stockTask.execute_sync)
+                    messages.append(str(result))
+                
+                elif state["news"]:
+                    stockAgent = StockAgents.StockAgent()
+                    NewsTask = NewsTasks.NewsAnalysisTask(stockAgent, state["news"])
+                    result = run_until_deadline(NewsTask.execute_sync)
+                    messages.append(str(result))
+                
+                elif state["stock_list"]:
+                    stockAgent = StockAgents.StockAgent()
+                    compareTask = CompareTasks.StockcomparisonTask(stockAgent, state["stock_list"])
+                    result = run_until_deadline(compareTask.execute_sync)
+                    messages.append(str(result))
+            except DeadlineExceeded:
+                messages.append(Nodes._partial_answer())
+                return {"messages": messages, "partial": True}
         
         return {"messages": messages}
     
+    @observe_node("SearchNode")
     def SearchNode(self, state):
         """
         SearchNode:
@@ -75,50 +88,151 @@ class Nodes:
         """
         
         if state["query"]:
-            searchAgent = SearchAgents.SearchAgent()
-            websearchTask = SearchTasks.WebSearchTask(searchAgent, state["query"])
-            result = websearchTask.execute_sync()
+            partial = False
+            with deadline_scope(state.get("deadline")):
+                try:
+                    searchAgent = SearchAgents.SearchAgent()
+                    websearchTask = SearchTasks.WebSearchTask(searchAgent, state["query"])
+                    result = str(run_until_deadline(websearchTask.execute_sync))
+                except DeadlineExceeded:
+                    result, partial = Nodes._partial_answer(), True
             messages = state["messages"]
             messages.append(result)
-            return {"messages": messages}
+            return {"messages": messages, "partial": partial}
     
+    @observe_node("WeatherNode")
     def WeatherNode(self, state):
         """
         WeatherNode:
-        - Handles weather check tasks based on the city provided in the state.
-        - If 'city' is provided, it triggers the weather analysis task and returns the result.
+        - Handles weather check tasks based on the cities provided in the state.
+        - If 'city' lists cities, it triggers the weather analysis task and returns the result.
         """
         
-        if state["city"]:
-            weatherAgent = WeatherAgents.WeatherAgent()
-            weatherTask = WeatherTasks.WeatherAnalaysisTask(weatherAgent, state["city"])
-            result = weatherTask.execute_sync()
+        cities = Nodes._city_list(state["city"])
+        if cities:
+            partial = False
+            with deadline_scope(state.get("deadline")):
+                try:
+                    weatherAgent = WeatherAgents.WeatherAgent()
+                    weatherTask = WeatherTasks.WeatherAnalaysisTask(weatherAgent, cities)
+                    result = str(run_until_deadline(weatherTask.execute_sync))
+                except DeadlineExceeded:
+                    result, partial = Nodes._partial_answer(), True
             messages = state["messages"]
             messages.append(result)
-            return {"messages": messages}
+            return {"messages": messages, "partial": partial}
 
+    @observe_node("replyNode")
     def replyNode(self, state):
         """
         replyNode:
         - This node invokes the language model with the user's query and appends the response to the messages.
         """
         query = state["query"]
-        agent = llm.invoke(f"""
-            {query}
-        """)
         messages = state["messages"]
-        messages.append(agent.content)
+        prompt = f"""
+            {query}
+        """
+        with deadline_scope(state.get("deadline")) as deadline:
+            try:
+                agent = run_until_deadline(llm.invoke, prompt, **Nodes._llm_kwargs(deadline))
+                messages.append(agent.content)
+            except DeadlineExceeded:
+                messages.append(Nodes._partial_answer())
+                return {"messages": messages, "partial": True}
         return {"messages": messages}
     
+    @observe_node("entryNode")
     def entryNode(self, state):
         """
         entryNode:
         - This is the first node to process the user's query.
         - Categorizes the query into different predefined categories (e.g., stock analysis, search, weather).
-        - Returns a categorized response in a JSON format.
+        - Returns the raw categorization (JSON text), which parseNode turns into state fields.
         """
         input_query = state["query"]
-        agent = llm.invoke(f"""
+        with deadline_scope(state.get("deadline")) as deadline:
+            try:
+                agent = run_until_deadline(llm.invoke, Nodes._entry_prompt(input_query), **Nodes._llm_kwargs(deadline))
+            except DeadlineExceeded:
+                messages = state["messages"]
+                messages.append(Nodes._partial_answer())
+                return {'messages': messages, 'entry_output': '', 'category': 'timeout', 'partial': True}
+        print("this the agent response ##################", agent)
+        return {'entry_output': agent.content}
+
+    @observe_node("parseNode")
+    def parseNode(self, state):
+        """
+        parseNode:
+        - Parses the entry node's categorization into the fields used for routing.
+        - Output that is not valid JSON is sent back to the language model once to be repaired.
+        - Being a node of its own, a failure here is resumed from the saved categorization.
+        """
+        output = state["entry_output"]
+        try:
+            response = Nodes._parse_entry_output(output)
+        except ValueError:
+            print("Could not parse the categorization, asking for a repair:", output)
+            with deadline_scope(state.get("deadline")) as deadline:
+                try:
+                    repaired = run_until_deadline(llm.invoke, Nodes._repair_prompt(output), **Nodes._llm_kwargs(deadline))
+                except DeadlineExceeded:
+                    messages = state["messages"]
+                    messages.append(Nodes._partial_answer())
+                    return {'messages': messages, 'category': 'timeout', 'partial': True}
+            response = Nodes._parse_entry_output(repaired.content)
+        return {'stock': response.get('stock', ''), 'news': response.get('news', ''),
+                'city': Nodes._city_list(response.get('city')),
+                'stock_list': response.get('stock_list', []), 'query': response.get('query') or state['query'],
+                'category': response.get('category', 'other')}
+
+    @staticmethod
+    def _parse_entry_output(output):
+        """
+        Parses the categorization JSON, ignoring code fences or text around the object.
+
+        Raises:
+            ValueError: If no JSON object can be parsed.
+        """
+        start, end = output.find("{"), output.rfind("}")
+        if start < 0 or end < start:
+            raise ValueError("No JSON object in the categorization")
+        response = json.loads(output[start:end + 1])
+        if not isinstance(response, dict):
+            raise ValueError("The categorization is not a JSON object")
+        return response
+
+    @staticmethod
+    def _city_list(city):
+        """
+        Returns the city names of the categorization as a list. A single string is one city:
+        it is not split on commas, which separate a city from its country ("Paris, France").
+        """
+        if isinstance(city, list):
+            return [str(name).strip() for name in city if str(name).strip()]
+        return [city.strip()] if isinstance(city, str) and city.strip() else []
+
+    @staticmethod
+    def _repair_prompt(output):
+        """
+        Builds the prompt asking the language model to fix an unparseable categorization.
+        """
+        return f"""
+        The text below was meant to be a single JSON object with the properties category, stock, news,
+        stock_list, city and query, but it could not be parsed.
+        ---
+        {output}
+        ---
+        Return only the corrected JSON object, with no additions before or after.
+        """
+
+    @staticmethod
+    def _entry_prompt(input_query):
+        """
+        Builds the categorization prompt used by the entry node.
+        """
+        return f"""
         User input
         ---
         {input_query}
@@ -136,10 +250,26 @@ class Nodes:
         stock: If category is 'stock_analysis' then give the stock ticker symbol of the company or stock mentioned here else keep it blank, give only the stock ticker.
         news: If category is 'stock_news' then give the stock ticker symbol of the company or stock mentioned here else keep it blank, give only the stock ticker.
         stock_list: If category is 'stock_comparison' then give a list of stock tickers to analyse else keep it blank, give only the list of stock tickers.
-        city: If category is 'city_weather' then the name of the city or keep it blank, give only the name of the city.
+        city: If category is 'city_weather' then a JSON list with one string per city mentioned, e.g. ["Paris"] or ["Paris, Texas", "London"] (a country or state may follow a city name after a comma), else an empty list.
         query: If category is 'other' then add the user's query here else keep it blank
         Remember the output should be just the json format with properties inside without any specification before or after.
-        """)
-        print("this the agent response ##################", agent)
-        response = json.loads(agent.content)
-        return {'stock': response["stock"], 'news': response['news'], 'city': response['city'], 'stock_list': response['stock_list'],'query': response['query'], 'category': response['category']}
+        """
+
+    @staticmethod
+    def _llm_kwargs(deadline):
+        """
+        Returns the per-call keyword arguments bounding a direct LLM call by the request deadline.
+        """
+        return {"timeout": deadline.timeout()} if deadline else {}
+
+    @staticmethod
+    def _partial_answer():
+        """
+        Builds the best answer possible from the tool outputs recorded before the deadline.
+        """
+        partials = partial_results()
+        if not partials:
+            return "Sorry, the request took too long and no data could be retrieved in time. Please try again."
+        sections = [f"**{source}**\n{str(data)[:PARTIAL_ANSWER_MAX_CHARS]}" for source, data in partials]
+        return ("The request reached its deadline before the analysis was complete. "
+                "Here is the data retrieved so far:\n\n" + "\n\n".join(sections))
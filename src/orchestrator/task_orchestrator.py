@@ -12,6 +12,16 @@ class Orchestrator:
     The route_query method evaluates the category in the query and returns the appropriate handler.
     """
 
+    @staticmethod
+    def route_entry(state):
+        """
+        Routes the entry node's output to the parse node.
+
+        Returns:
+            str: 'parse', or 'end' when the entry node ran out of time and already answered.
+        """
+        return "parse" if state.get('entry_output') else "end"
+
     @staticmethod
     def route_query(state):
         """
@@ -21,7 +31,7 @@ class Orchestrator:
             state (dict): The state containing the query information, including the category.
 
         Returns:
-            str: The appropriate task handler category ('stock', 'city', 'search', or 'reply').
+            str: The appropriate task handler category ('stock', 'city', 'search', 'end' or 'reply').
         """
         category = state.get('category', 'other')
         print("Category: ", category)
@@ -33,5 +43,8 @@ class Orchestrator:
             return "city"
         elif category == "other":
             return "search"
+        elif category == "timeout":
+            # The parse node ran out of time and already answered with what it had
+            return "end"
         else:
             return "reply"
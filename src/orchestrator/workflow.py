@@ -0,0 +1,52 @@
+"""
+This module assembles the LangGraph workflow that routes a user query through the entry node
+(categorization) and the parse node to the stock, search or weather nodes.
+It is shared by the Chainlit app (in-process mode) and the worker processes (split mode).
+"""
+
+from nodes.nodes import Nodes
+from messages.state import AgentState
+from orchestrator.task_orchestrator import Orchestrator
+from runtime.checkpoint import make_checkpointer
+from langgraph.graph import END, StateGraph
+
+
+def create_workflow(checkpointer=None):
+    """
+    Assembles the workflow and returns a compiled StateGraph app.
+    With a `checkpointer`, the state is saved after every node so failed runs can be resumed.
+    """
+    workflow = StateGraph(AgentState)
+    node = Nodes()
+    workflow.add_node('entryNode', node.entryNode)
+    workflow.add_node('parseNode', node.parseNode)
+    workflow.add_node('StockNode', node.StockNode)
+    workflow.add_node('SearchNode', node.SearchNode)
+    workflow.add_node('WeatherNode', node.WeatherNode)
+    workflow.add_node("responder", node.replyNode)
+
+    # Parsing is a node of its own: a parse failure resumes from the saved categorization
+    workflow.add_conditional_edges('entryNode', Orchestrator.route_entry, {
+        "parse": "parseNode",
+        "end": END
+    })
+    workflow.add_conditional_edges('parseNode', Orchestrator.route_query, {
+        "stock": "StockNode",
+        "search": "SearchNode",
+        "city": "WeatherNode",
+        "end": END
+    })
+    workflow.add_edge("StockNode", END)
+    workflow.add_edge("WeatherNode", END)
+    workflow.add_edge("SearchNode", END)
+    workflow.add_edge("responder", END)
+
+    workflow.set_entry_point("entryNode")
+    return workflow.compile(checkpointer=checkpointer)
+
+
+def create_resumable_workflow():
+    """
+    Returns the workflow compiled with the checkpointer configured by CHECKPOINTER.
+    """
+    return create_workflow(make_checkpointer())
@@ -0,0 +1,240 @@
+"""
+This module makes graph runs resumable.
+
+The workflow is compiled with a LangGraph checkpointer (in-memory or SQLite), which saves the
+state after every node. Each request runs in its own checkpoint thread keyed by the chat session
+and the normalized question, so when a request fails (an unparseable categorization in `parseNode`,
+an agent exception, a dropped connection) and the user sends the same question again, the run
+resumes after the last completed node and reuses its outputs instead of starting over. Completed
+runs are never reused: sending an answered question again runs it afresh, since its data (prices,
+news, weather) may have changed.
+
+Each thread also carries a run status (running, failed or done), kept next to the checkpoints
+(in the SQLite file for the "sqlite" checkpointer, so all worker processes see it). Only runs
+marked failed are resumed; a question sent again while its run is still going (a retried message,
+or a resend after the front end gave up in split mode) is rejected with RunInProgress, so two runs
+never write to the same thread at once. A run still marked running RUN_GRACE_SECONDS after its
+deadline is taken as lost (its process died) and the question runs afresh.
+
+Configuration (environment variables):
+- CHECKPOINTER: "memory" (default), "sqlite" or "none".
+- CHECKPOINT_DB: SQLite file for the "sqlite" checkpointer (default "checkpoints.db"); required
+  to resume across worker processes in split mode.
+- CHECKPOINT_RESUME_WINDOW: seconds a failed run can be resumed (default 300).
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+RESUME_WINDOW_SECONDS = float(os.environ.get("CHECKPOINT_RESUME_WINDOW", "300"))
+RUN_GRACE_SECONDS = 60  # past its deadline plus this, a run still marked running is considered lost
+
+RUNNING, FAILED, DONE = "running", "failed", "done"
+
+_finished = deque()  # (finished_at, checkpointer, thread_id) awaiting cleanup
+_finished_lock = threading.Lock()
+_run_status = {}  # thread_id -> (status, held_until) for checkpointers without a database
+_run_status_lock = threading.Lock()
+
+
+class RunInProgress(RuntimeError):
+    """
+    Raised when a request is sent again while its previous run is still being answered.
+    """
+
+
+def make_checkpointer(kind=None, path=None):
+    """
+    Creates the checkpointer selected by `kind` (or CHECKPOINTER), or None when disabled.
+    """
+    kind = kind or os.environ.get("CHECKPOINTER", "memory")
+    if kind == "none":
+        return None
+    if kind == "memory":
+        from langgraph.checkpoint.memory import MemorySaver
+        return MemorySaver()
+    if kind == "sqlite":
+        try:
+            from langgraph.checkpoint.sqlite import SqliteSaver
+        except ImportError:
+            raise ImportError("The `langgraph-checkpoint-sqlite` package is required for CHECKPOINTER=sqlite.")
+        conn = sqlite3.connect(path or os.environ.get("CHECKPOINT_DB", "checkpoints.db"), check_same_thread=False)
+        # WAL with relaxed syncing keeps a checkpoint write to roughly one sequential append
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        saver = SqliteSaver(conn)
+        saver.setup()
+        conn.execute("CREATE TABLE IF NOT EXISTS run_status "
+                     "(thread_id TEXT PRIMARY KEY, status TEXT NOT NULL, held_until REAL NOT NULL)")
+        conn.commit()
+        return saver
+    raise ValueError(f"Unsupported checkpointer: {kind}")
+
+
+def request_config(session_id, query):
+    """
+    Returns the run config of a request: its checkpoint thread is keyed by session and question.
+    """
+    request_id = hashlib.sha1(" ".join(query.lower().split()).encode("utf-8")).hexdigest()[:16]
+    return {"configurable": {"thread_id": f"{session_id}:{request_id}"}}
+
+
+def prepare_run(app, inputs, config):
+    """
+    Decides how to run a request against its checkpoint thread and marks the thread running.
+    Every run prepared here must end with `schedule_cleanup`.
+
+    Returns:
+        The input to run the graph with: None to resume a run of the same request that failed
+        within the resume window, or `inputs` for a fresh run.
+
+    Raises:
+        RunInProgress: If a run of the same request is still going.
+    """
+    checkpointer = getattr(app, "checkpointer", None)
+    if checkpointer is None:
+        return inputs
+
+    thread_id = config["configurable"]["thread_id"]
+    held_until = (inputs.get("deadline") or time.time() + RESUME_WINDOW_SECONDS) + RUN_GRACE_SECONDS
+    previous_status = _claim_run(checkpointer, thread_id, held_until)
+    if previous_status != FAILED:
+        # New question, answered (possibly partially) or lost run: run afresh
+        return inputs
+
+    snapshot = app.get_state(config)
+    if not snapshot.values or not snapshot.next or _age(snapshot) > RESUME_WINDOW_SECONDS:
+        # Nothing saved, or the failure is too old to reuse: run afresh
+        return inputs
+
+    writes = (snapshot.metadata or {}).get("writes") or {}
+    completed_nodes = [node for node in writes if not node.startswith("__")]
+    if not completed_nodes:
+        # Failed before any node completed: nothing to reuse
+        return inputs
+
+    # Resume with a fresh deadline; updating as the last completed node keeps its routing
+    app.update_state(config, {"deadline": inputs.get("deadline")}, as_node=completed_nodes[-1])
+    return None
+
+
+def schedule_cleanup(app, config, failed=False):
+    """
+    Called when a run prepared by `prepare_run` ends: answered, or `failed` if the graph raised.
+    Its status is recorded (only failed runs are resumed) and its checkpoints are kept for the
+    resume window, then discarded.
+    """
+    checkpointer = getattr(app, "checkpointer", None)
+    if checkpointer is None:
+        return
+    thread_id = config["configurable"]["thread_id"]
+    _set_run_status(checkpointer, thread_id, FAILED if failed else DONE)
+    now = time.time()
+    with _finished_lock:
+        _finished.append((now, checkpointer, thread_id))
+        expired = []
+        while _finished and _finished[0][0] < now - RESUME_WINDOW_SECONDS:
+            expired.append(_finished.popleft())
+    for _, saver, expired_thread_id in expired:
+        # A newer run of the thread keeps its checkpoints; it schedules their cleanup when it ends
+        if _run_status_of(saver, expired_thread_id) != RUNNING:
+            discard_checkpoints(saver, expired_thread_id)
+
+
+def discard_checkpoints(checkpointer, thread_id):
+    """
+    Deletes every checkpoint of a thread.
+    """
+    if hasattr(checkpointer, "delete_thread"):
+        checkpointer.delete_thread(thread_id)
+    elif hasattr(checkpointer, "storage"):  # MemorySaver
+        checkpointer.storage.pop(thread_id, None)
+        for key in [key for key in checkpointer.writes if key[0] == thread_id]:
+            checkpointer.writes.pop(key, None)
+    elif hasattr(checkpointer, "conn"):  # SqliteSaver
+        with checkpointer.lock:
+            checkpointer.conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+            checkpointer.conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+            checkpointer.conn.commit()
+    if hasattr(checkpointer, "conn"):
+        with checkpointer.lock:
+            checkpointer.conn.execute("DELETE FROM run_status WHERE thread_id = ?", (thread_id,))
+            checkpointer.conn.commit()
+    else:
+        with _run_status_lock:
+            _run_status.pop(thread_id, None)
+
+
+def _claim_run(checkpointer, thread_id, held_until):
+    """
+    Marks a thread running until `held_until`, unless a live run holds it.
+
+    Returns:
+        The thread's previous status (None if it has none).
+
+    Raises:
+        RunInProgress: If the thread is marked running and its hold has not lapsed.
+    """
+    now = time.time()
+    if hasattr(checkpointer, "conn"):  # SqliteSaver: the status is shared with the other processes
+        with checkpointer.lock:
+            conn = checkpointer.conn
+            row = conn.execute("SELECT status FROM run_status WHERE thread_id = ?", (thread_id,)).fetchone()
+            # The upsert only takes the thread if no live run holds it, atomically across processes
+            claimed = conn.execute(
+                "INSERT INTO run_status (thread_id, status, held_until) VALUES (?, ?, ?) "
+                "ON CONFLICT(thread_id) DO UPDATE SET status = excluded.status, held_until = excluded.held_until "
+                "WHERE run_status.status != ? OR run_status.held_until <= ?",
+                (thread_id, RUNNING, held_until, RUNNING, now)).rowcount
+            conn.commit()
+        previous_status = row[0] if row else None
+    else:
+        with _run_status_lock:
+            previous_status, previous_hold = _run_status.get(thread_id, (None, 0.0))
+            claimed = previous_status != RUNNING or previous_hold <= now
+            if claimed:
+                _run_status[thread_id] = (RUNNING, held_until)
+    if not claimed:
+        raise RunInProgress("This question is still being answered. Please wait for its answer.")
+    return previous_status
+
+
+def _set_run_status(checkpointer, thread_id, status):
+    if hasattr(checkpointer, "conn"):
+        with checkpointer.lock:
+            checkpointer.conn.execute("UPDATE run_status SET status = ?, held_until = 0 WHERE thread_id = ?",
+                                      (status, thread_id))
+            checkpointer.conn.commit()
+    else:
+        with _run_status_lock:
+            _run_status[thread_id] = (status, 0.0)
+
+
+def _run_status_of(checkpointer, thread_id):
+    """
+    Returns the status of a thread (None if it has none). A lapsed running hold counts as none.
+    """
+    if hasattr(checkpointer, "conn"):
+        with checkpointer.lock:
+            row = checkpointer.conn.execute("SELECT status, held_until FROM run_status WHERE thread_id = ?",
+                                            (thread_id,)).fetchone()
+    else:
+        with _run_status_lock:
+            row = _run_status.get(thread_id)
+    if row is None or (row[0] == RUNNING and row[1] <= time.time()):
+        return None
+    return row[0]
+
+
+def _age(snapshot):
+    """
+    Returns the seconds elapsed since the snapshot was saved.
+    """
+    if not snapshot.created_at:
+        return 0.0
+    return time.time() - datetime.fromisoformat(snapshot.created_at).timestamp()
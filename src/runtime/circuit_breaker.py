@@ -0,0 +1,98 @@
+"""
+This module defines per-upstream circuit breakers.
+
+A breaker counts consecutive failures of one upstream (Polygon, Serper, WeatherAPI, Yahoo).
+After `failure_threshold` failures it opens: calls are rejected immediately with `CircuitOpen`
+instead of waiting on a degraded service, and the caches fall back to stale data. After
+`reset_timeout` seconds one probe call is let through (half-open); its success closes the
+breaker, its failure opens it again.
+"""
+
+import threading
+import time
+
+from runtime import metrics
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+BREAKER_STATES = [CLOSED, HALF_OPEN, OPEN]  # index = value of the state gauge
+
+BREAKER_OPENED = metrics.counter("upstream_breaker_opened_total", "Times a circuit breaker opened.", ["upstream"])
+
+
+class CircuitOpen(Exception):
+    """
+    Raised instead of calling an upstream whose breaker is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    A thread-safe circuit breaker for one upstream service.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """
+        Admits or rejects a call.
+
+        Raises:
+            CircuitOpen: If the breaker is open, or half-open with its probe already in flight.
+        """
+        with self._lock:
+            if self.state == OPEN and time.time() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == CLOSED:
+                return
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            self.rejected += 1
+        raise CircuitOpen(f"{self.name} is unavailable (circuit open), try again later")
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def release(self):
+        """
+        Ends a call without judging the upstream (e.g. the request ran out of time),
+        so a half-open breaker can send another probe.
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.times_opened += 1
+                    BREAKER_OPENED.labels(self.name).inc()
+                self.state = OPEN
+                self.opened_at = time.time()
+                self._probe_in_flight = False
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
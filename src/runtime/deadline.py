@@ -0,0 +1,239 @@
+"""
+Subfolder: runtime
+Role: Cross-cutting runtime helpers shared by the app, the nodes and the tools.
+
+File: deadline.py
+Purpose: Per-request deadlines. The deadline is stored in the graph state as an absolute
+timestamp, re-established as a context variable inside each node, and read by the LLM and
+tool calls to bound their own timeouts. Tools also record what they fetched so a node that
+runs out of time can still answer with the data gathered so far, and can fan independent
+upstream calls out concurrently within the same deadline.
+"""
+
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+from contextlib import contextmanager
+
+from runtime import metrics
+
+# Grace period under which a call is not worth starting at all
+MIN_CALL_SECONDS = 0.5
+
+_current_deadline = contextvars.ContextVar("deadline", default=None)
+_partial_results = contextvars.ContextVar("partial_results", default=None)
+_in_fanout = contextvars.ContextVar("in_fanout", default=False)
+
+ABANDONED_RUNS = metrics.gauge("deadline_abandoned_runs", "Calls still running after their request deadline expired.")
+
+# Pool for tool fan-outs (agent runs get a thread of their own, see `run_until_deadline`)
+_fanout_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="fanout")
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised when a request runs past its deadline.
+    """
+
+
+class Deadline:
+    """
+    An absolute point in time by which a request must have produced its answer.
+    """
+
+    def __init__(self, expires_at):
+        self.expires_at = float(expires_at)
+
+    @classmethod
+    def after(cls, seconds):
+        """
+        Creates a deadline expiring `seconds` from now.
+        """
+        return cls(time.time() + float(seconds))
+
+    def remaining(self):
+        """
+        Returns the number of seconds left before the deadline (never negative).
+        """
+        return max(0.0, self.expires_at - time.time())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def timeout(self, cap=None):
+        """
+        Returns a timeout for a single call: the time left, bounded by `cap` if given.
+
+        Raises:
+            DeadlineExceeded: If too little time is left to start the call.
+        """
+        remaining = self.remaining()
+        if remaining < MIN_CALL_SECONDS:
+            raise DeadlineExceeded("Request deadline exceeded")
+        return min(remaining, cap) if cap is not None else remaining
+
+
+def current_deadline():
+    """
+    Returns the deadline of the request being processed, or None outside a deadline scope.
+    """
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(expires_at):
+    """
+    Establishes the request deadline (an absolute timestamp, or None for no deadline)
+    and a fresh partial-results collector for the duration of the block.
+    """
+    deadline = Deadline(expires_at) if expires_at else None
+    deadline_token = _current_deadline.set(deadline)
+    partials_token = _partial_results.set([])
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(deadline_token)
+        _partial_results.reset(partials_token)
+
+
+def call_timeout(default):
+    """
+    Returns the timeout to use for an outbound call: `default` capped by the request deadline.
+
+    Raises:
+        DeadlineExceeded: If the request deadline has already passed.
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return default
+    return deadline.timeout(cap=default)
+
+
+def check_deadline():
+    """
+    Stops the current unit of work (agent step, LLM call) once the request deadline has passed.
+
+    Raises:
+        DeadlineExceeded: If the request deadline has passed.
+    """
+    deadline = current_deadline()
+    if deadline is not None and deadline.expired():
+        raise DeadlineExceeded("Request deadline exceeded")
+
+
+def record_partial(source, data):
+    """
+    Records data fetched by a tool so it can be returned if the request runs out of time.
+    """
+    partials = _partial_results.get()
+    if partials is not None:
+        partials.append((source, data))
+
+
+def partial_results():
+    """
+    Returns the (source, data) pairs recorded so far in the current deadline scope.
+    """
+    return list(_partial_results.get() or [])
+
+
+def run_until_deadline(fn, *args, **kwargs):
+    """
+    Runs `fn` and returns its result, giving up when the current deadline expires.
+
+    The call runs in a thread of its own carrying a copy of the current context, so tools
+    invoked by `fn` see the same deadline and partial-results collector. On expiry the
+    caller is released immediately. A running thread cannot be cancelled: the abandoned call
+    stops at its next agent step, LLM or tool call, which fail against the expired deadline
+    (see `check_deadline` and `call_timeout`). Until then it holds no slot any other request
+    is waiting for.
+
+    Raises:
+        DeadlineExceeded: If the deadline expires before `fn` returns.
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return fn(*args, **kwargs)
+
+    timeout = deadline.timeout()
+    context = contextvars.copy_context()
+    future = Future()
+    lock = threading.Lock()
+    abandoned = False
+
+    def run():
+        nonlocal abandoned
+        try:
+            future.set_result(context.run(fn, *args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with lock:
+                if abandoned:
+                    ABANDONED_RUNS.dec()
+
+    threading.Thread(target=run, name="deadline-run", daemon=True).start()
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeout:
+        with lock:
+            abandoned = not future.done()
+            if abandoned:
+                ABANDONED_RUNS.inc()
+        if not abandoned:  # finished while the timeout was being handled
+            return future.result()
+        raise DeadlineExceeded("Request deadline exceeded")
+
+
+def gather_until_deadline(calls):
+    """
+    Runs independent calls concurrently and waits for all of them, at most until the deadline.
+
+    A gather started from a call of another gather runs its calls one after the other in the
+    calling thread: waiting on the shared pool from one of its own threads can deadlock it
+    once every thread is waiting.
+
+    Args:
+        calls (dict): Maps a name to a `(fn, *args)` tuple.
+
+    Returns:
+        dict: Maps each name to its result, or to the exception it raised
+        (DeadlineExceeded for calls still running at the deadline).
+    """
+    deadline = current_deadline()
+    if _in_fanout.get():
+        return {name: _call_before_deadline(deadline, fn, *args) for name, (fn, *args) in calls.items()}
+
+    futures = {}
+    for name, (fn, *args) in calls.items():
+        context = contextvars.copy_context()
+        futures[name] = _fanout_executor.submit(context.run, _fanout_call, fn, *args)
+    wait(futures.values(), timeout=deadline.remaining() if deadline else None)
+
+    results = {}
+    for name, future in futures.items():
+        if not future.done():
+            future.cancel()
+            results[name] = DeadlineExceeded("Request deadline exceeded")
+        else:
+            results[name] = future.exception() or future.result()
+    return results
+
+
+def _fanout_call(fn, *args):
+    # Runs in the copied context of one fan-out call: nested gathers see the flag
+    _in_fanout.set(True)
+    return fn(*args)
+
+
+def _call_before_deadline(deadline, fn, *args):
+    """
+    Runs one call of a nested gather, returning its result or the exception it raised.
+    """
+    if deadline is not None and deadline.expired():
+        return DeadlineExceeded("Request deadline exceeded")
+    try:
+        return fn(*args)
+    except Exception as e:
+        return e
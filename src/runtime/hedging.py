@@ -0,0 +1,127 @@
+"""
+This module defines hedged requests for idempotent upstream GETs.
+
+The first attempt is started right away. If it has not finished after the upstream's recent
+p95 latency, a second, identical attempt is started and whichever succeeds first is returned.
+Only the slowest ~5% of calls are hedged, so tail latency drops for little extra load; a cap on
+the share of hedged calls keeps a degraded upstream from receiving double traffic.
+
+The delay is also capped at a multiple of the median: when 5% or more of the calls are slow,
+the p95 itself falls in the slow tail and hedging at it would never help those calls.
+"""
+
+import contextvars
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from runtime import metrics
+
+MIN_SAMPLES = 20  # latencies needed before the p95 is trusted
+DEFAULT_DELAY = 1.0  # hedge delay (seconds) until then
+MAX_DELAY_OVER_MEDIAN = 3  # the hedge delay never exceeds this multiple of the median latency
+MAX_HEDGE_RATIO = 0.1  # at most this share of calls get a second attempt
+
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="hedge")
+
+HEDGEABLE_CALLS = metrics.counter("upstream_hedgeable_calls_total", "Calls eligible for hedging.", ["upstream"])
+HEDGES = metrics.counter("upstream_hedges_total", "Second attempts started by hedging.", ["upstream"])
+HEDGE_WINS = metrics.counter("upstream_hedge_wins_total", "Hedged calls answered by the second attempt.", ["upstream"])
+
+
+class LatencyTracker:
+    """
+    Keeps the most recent successful call latencies of one upstream.
+    """
+
+    def __init__(self, size=200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction):
+        """
+        Returns the given percentile (0-1) of the recent latencies, or None with too few samples.
+        """
+        with self._lock:
+            if len(self._samples) < MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Hedger:
+    """
+    Issues hedged calls to one upstream and tracks how often hedging fires and wins.
+    """
+
+    def __init__(self, name, max_hedge_ratio=MAX_HEDGE_RATIO):
+        self.name = name
+        self.max_hedge_ratio = max_hedge_ratio
+        self.latency = LatencyTracker()
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+
+    def delay(self):
+        """
+        Returns how long to wait for the first attempt before hedging: the recent p95,
+        at most MAX_DELAY_OVER_MEDIAN times the recent median.
+        """
+        p95 = self.latency.percentile(0.95)
+        if p95 is None:
+            return DEFAULT_DELAY
+        return min(p95, MAX_DELAY_OVER_MEDIAN * self.latency.percentile(0.5))
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Calls `fn`, starting a second attempt if the first is slower than the recent p95.
+        Returns the first successful result; raises the last error if every attempt fails.
+        """
+        with self._lock:
+            self.calls += 1
+        HEDGEABLE_CALLS.labels(self.name).inc()
+        attempts = [self._submit(fn, *args, **kwargs)]
+        done, _ = wait(attempts, timeout=self.delay())
+        if not done and self._may_hedge():
+            attempts.append(self._submit(fn, *args, **kwargs))
+
+        pending, error = set(attempts), None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if len(attempts) > 1 and future is attempts[1]:
+                        with self._lock:
+                            self.hedge_wins += 1
+                        HEDGE_WINS.labels(self.name).inc()
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "hedge_rate": self.hedged / self.calls if self.calls else 0.0,
+                "delay_seconds": self.delay(),
+            }
+
+    def _may_hedge(self):
+        with self._lock:
+            if self.hedged >= self.max_hedge_ratio * self.calls:
+                return False
+            self.hedged += 1
+        HEDGES.labels(self.name).inc()
+        return True
+
+    def _submit(self, fn, *args, **kwargs):
+        # Each attempt sees the caller's context (request deadline, partial results)
+        context = contextvars.copy_context()
+        return _executor.submit(context.run, fn, *args, **kwargs)
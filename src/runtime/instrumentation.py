@@ -0,0 +1,137 @@
+"""
+Subfolder: runtime
+Role: Cross-cutting runtime helpers shared by the app, the nodes and the tools.
+
+File: instrumentation.py
+Purpose: Hooks that report graph nodes, tools and LLM calls into the metrics registry
+(see metrics.py):
+- `observe_node`: node latency by outcome (ok, partial answer at the deadline, error).
+- `instrumented_tool`: tool calls by outcome and tool latency.
+- `LLMMetricsCallback` (LangChain clients) and `install_litellm_metrics` (crewAI agents, which
+  call the model through LiteLLM): LLM requests, latency, tokens and output tokens per second.
+"""
+
+import functools
+import time
+from datetime import datetime
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from runtime import metrics
+
+# Output tokens per second of a completion
+TOKEN_RATE_BUCKETS = (5, 10, 20, 30, 40, 60, 80, 100, 150, 200, 300)
+
+NODE_SECONDS = metrics.histogram("node_seconds", "Duration of graph node runs.", ["node", "outcome"])
+TOOL_CALLS = metrics.counter("tool_calls_total", "Agent tool calls.", ["tool", "outcome"])
+TOOL_SECONDS = metrics.histogram("tool_seconds", "Duration of agent tool calls.", ["tool"])
+LLM_REQUESTS = metrics.counter("llm_requests_total", "LLM completion requests.", ["model", "client", "outcome"])
+LLM_SECONDS = metrics.histogram("llm_request_seconds", "Duration of LLM completion requests.", ["model", "client"])
+LLM_TOKENS = metrics.counter("llm_tokens_total", "LLM tokens consumed.", ["model", "client", "kind"])
+LLM_TOKENS_PER_SECOND = metrics.histogram("llm_output_tokens_per_second", "Completion tokens generated per second.",
+                                          ["model", "client"], buckets=TOKEN_RATE_BUCKETS)
+
+
+def observe_node(node):
+    """
+    Decorates a graph node method so each run is timed and labeled with its outcome.
+    """
+    def decorate(run):
+        @functools.wraps(run)
+        def observed(self, state):
+            started, outcome = time.perf_counter(), "error"
+            try:
+                result = run(self, state)
+                outcome = "partial" if (result or {}).get("partial") else "ok"
+                return result
+            finally:
+                NODE_SECONDS.labels(node, outcome).observe(time.perf_counter() - started)
+        return observed
+    return decorate
+
+
+def instrumented_tool(fn):
+    """
+    Decorates a tool function (below `@tool`) so each call is timed and counted by outcome.
+    Tools report failures as `{"error": ...}` results, which count as errors.
+    """
+    @functools.wraps(fn)
+    def call(*args, **kwargs):
+        started, outcome = time.perf_counter(), "error"
+        try:
+            result = fn(*args, **kwargs)
+            outcome = "error" if isinstance(result, dict) and "error" in result else "ok"
+            return result
+        finally:
+            TOOL_CALLS.labels(fn.__name__, outcome).inc()
+            TOOL_SECONDS.labels(fn.__name__).observe(time.perf_counter() - started)
+    return call
+
+
+def record_llm_call(model, client, seconds, prompt_tokens=0, completion_tokens=0, outcome="ok"):
+    """
+    Records one LLM request.
+    """
+    model = model or "unknown"
+    LLM_REQUESTS.labels(model, client, outcome).inc()
+    LLM_SECONDS.labels(model, client).observe(seconds)
+    if prompt_tokens:
+        LLM_TOKENS.labels(model, client, "prompt").inc(prompt_tokens)
+    if completion_tokens:
+        LLM_TOKENS.labels(model, client, "completion").inc(completion_tokens)
+        if seconds > 0:
+            LLM_TOKENS_PER_SECOND.labels(model, client).observe(completion_tokens / seconds)
+
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """
+    LangChain callback recording the requests of a chat model client (e.g. AzureChatOpenAI).
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._started = {}  # run_id -> start time
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        seconds = time.perf_counter() - self._started.pop(run_id, time.perf_counter())
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        record_llm_call(self.model, "langchain", seconds,
+                        usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        seconds = time.perf_counter() - self._started.pop(run_id, time.perf_counter())
+        record_llm_call(self.model, "langchain", seconds, outcome="error")
+
+
+def install_litellm_metrics():
+    """
+    Registers LiteLLM callbacks recording the requests made by crewAI agents. Idempotent, and
+    called again by every `DeadlineLLM` since crewAI's `LLM.__init__` resets LiteLLM's callbacks.
+    """
+    import litellm
+
+    if _litellm_success not in litellm.success_callback:
+        litellm.success_callback.append(_litellm_success)
+        litellm.failure_callback.append(_litellm_failure)
+
+
+def _litellm_success(kwargs, completion_response, start_time, end_time):
+    usage = getattr(completion_response, "usage", None)
+    record_llm_call(kwargs.get("model"), "litellm", _elapsed(start_time, end_time),
+                    getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0)
+
+
+def _litellm_failure(kwargs, completion_response, start_time, end_time):
+    record_llm_call(kwargs.get("model"), "litellm", _elapsed(start_time, end_time), outcome="error")
+
+
+def _elapsed(start_time, end_time):
+    if isinstance(start_time, datetime):
+        return (end_time - start_time).total_seconds()
+    return float(end_time - start_time)
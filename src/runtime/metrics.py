@@ -0,0 +1,380 @@
+"""
+Subfolder: runtime
+Role: Cross-cutting runtime helpers shared by the app, the nodes and the tools.
+
+File: metrics.py
+Purpose: In-process metrics: counters, gauges and fixed-bucket histograms with labels, exported
+in the Prometheus text format on a local HTTP endpoint (`/metrics`, plus `/metrics.json`) and
+dumpable to JSON for the benchmarks.
+
+Counters and histograms sit on the hot path (every tool call, upstream request and LLM call), so
+their updates take no lock: each thread accumulates into its own shard, and a scrape sums the
+shards. When a thread exits, its shard is folded into a base total, so short-lived threads
+(e.g. the AnyIO worker threads behind Chainlit) do not pile up shards. Gauges are set rarely and use a plain lock. Values that only exist as state elsewhere
+(e.g. the job queue depth) are refreshed at scrape time by registered collectors.
+
+Configuration (environment variables):
+- METRICS_PORT: port of the metrics endpoint of the app process (disabled when unset).
+- WORKER_METRICS_PORT: first port of the worker processes' endpoints (worker i uses port + i).
+- METRICS_HOST: interface the endpoints bind to (default 127.0.0.1).
+"""
+
+import json
+import math
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latency buckets (seconds) spanning a cache hit to a slow agent run
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class _ShardOwner:
+    """
+    Stored in a thread's local data next to its shard: freed when the thread exits.
+    """
+
+
+class _Shards:
+    """
+    Per-thread accumulators of `size` values. Each thread only writes its own shard,
+    so updates need no lock; totals are the column sums over the live shards and the
+    base total that the shards of exited threads were merged into.
+    """
+
+    def __init__(self, size):
+        self._size = size
+        self._local = threading.local()
+        self._shards = {}  # id(shard) -> shard, for live threads
+        self._base = [0.0] * size
+        self._lock = threading.Lock()
+
+    def mine(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = [0.0] * self._size
+            self._local.owner = owner = _ShardOwner()
+            with self._lock:
+                self._shards[id(shard)] = shard
+            # The thread's local data is released when it exits: merge its shard then
+            weakref.finalize(owner, self._retire, shard)
+        return shard
+
+    def totals(self):
+        with self._lock:
+            columns = zip(self._base, *self._shards.values())
+            return [math.fsum(column) for column in columns]
+
+    def _retire(self, shard):
+        with self._lock:
+            if self._shards.pop(id(shard), None) is not None:
+                self._base = [math.fsum(pair) for pair in zip(self._base, shard)]
+
+
+class _CounterChild:
+
+    def __init__(self):
+        self._shards = _Shards(1)
+
+    def inc(self, amount=1):
+        self._shards.mine()[0] += amount
+
+    def value(self):
+        return self._shards.totals()[0]
+
+
+class _GaugeChild:
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value):
+        with self._lock:
+            self._value = float(value)
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    @contextmanager
+    def track_inprogress(self):
+        """
+        Counts the block as in progress while it runs.
+        """
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+    def value(self):
+        with self._lock:
+            return self._value
+
+
+class _HistogramChild:
+
+    def __init__(self, buckets):
+        self._buckets = buckets
+        # One count per bucket (the last one is +Inf), then the sum and the count of observations
+        self._shards = _Shards(len(buckets) + 3)
+
+    def observe(self, value):
+        shard = self._shards.mine()
+        shard[bisect_left(self._buckets, value)] += 1
+        shard[-2] += value
+        shard[-1] += 1
+
+    @contextmanager
+    def time(self):
+        """
+        Observes the duration of the block, in seconds.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def value(self):
+        """
+        Returns the cumulative bucket counts, keyed by upper bound, with the sum and count.
+        """
+        totals = self._shards.totals()
+        cumulative, running = {}, 0.0
+        for bound, count in zip(list(self._buckets) + [math.inf], totals[:-2]):
+            running += count
+            cumulative[bound] = running
+        return {"buckets": cumulative, "sum": totals[-2], "count": totals[-1]}
+
+
+class Metric:
+    """
+    A named metric family; `labels(...)` returns the child holding the values of one label set.
+    A family without label names can be updated directly (`counter.inc()`).
+    """
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values, **kwvalues):
+        if kwvalues:
+            values = tuple(kwvalues[name] for name in self.labelnames)
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def children(self):
+        with self._lock:
+            return list(self._children.items())
+
+    def __getattr__(self, attribute):
+        # inc(), set(), observe(), time()... on an unlabeled family go to its single child
+        if attribute.startswith("_") or self.labelnames:
+            raise AttributeError(attribute)
+        return getattr(self.labels(), attribute)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+
+class Registry:
+    """
+    Holds the metric families of a process and renders them for export.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def register_collector(self, collect):
+        """
+        Registers a function called before every export, to refresh gauges from external state.
+        """
+        with self._lock:
+            self._collectors.append(collect)
+
+    def collect(self):
+        """
+        Runs the collectors and returns the metric families.
+        """
+        with self._lock:
+            collectors = list(self._collectors)
+        for collect in collectors:
+            try:
+                collect()
+            except Exception as e:
+                print(f"Metrics collector {collect.__name__} failed: {e}")
+        with self._lock:
+            return list(self._metrics.values())
+
+    def to_prometheus(self):
+        """
+        Renders every metric in the Prometheus text exposition format (version 0.0.4).
+        """
+        lines = []
+        for metric in self.collect():
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for key, child in metric.children():
+                labels = dict(zip(metric.labelnames, key))
+                if metric.kind != "histogram":
+                    lines.append(f"{metric.name}{_labels(labels)} {_number(child.value())}")
+                    continue
+                value = child.value()
+                for bound, count in value["buckets"].items():
+                    lines.append(f"{metric.name}_bucket{_labels(dict(labels, le=_number(bound)))} {_number(count)}")
+                lines.append(f"{metric.name}_sum{_labels(labels)} {_number(value['sum'])}")
+                lines.append(f"{metric.name}_count{_labels(labels)} {_number(value['count'])}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self):
+        """
+        Returns every metric as plain data: {name: {"type", "help", "samples": [{"labels", "value"}]}}.
+        """
+        result = {}
+        for metric in self.collect():
+            samples = []
+            for key, child in metric.children():
+                value = child.value()
+                if metric.kind == "histogram":
+                    value = dict(value, buckets={_number(bound): count for bound, count in value["buckets"].items()})
+                samples.append({"labels": dict(zip(metric.labelnames, key)), "value": value})
+            result[metric.name] = {"type": metric.kind, "help": metric.documentation, "samples": samples}
+        return result
+
+    def dump_json(self, path):
+        """
+        Writes `to_dict()` to a JSON file.
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def _register(self, cls, name, documentation, labelnames, **kwargs):
+        # Idempotent, so a module defining its metrics can be imported again safely
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered with another type or labels")
+            return metric
+
+
+# The registry every module of the process reports into
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+register_collector = REGISTRY.register_collector
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split("?")[0] == "/metrics":
+            body, content_type = REGISTRY.to_prometheus(), "text/plain; version=0.0.4; charset=utf-8"
+        elif self.path.split("?")[0] == "/metrics.json":
+            body, content_type = json.dumps(REGISTRY.to_dict()), "application/json"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+
+
+def start_metrics_server(port=None, host=None):
+    """
+    Serves the registry on `port` (or METRICS_PORT) from a background thread, once per process.
+    Returns the server, or None when no port is configured.
+    """
+    global _server
+    port = port if port is not None else os.environ.get("METRICS_PORT")
+    if _server is not None or port in (None, ""):
+        return _server
+    server = ThreadingHTTPServer((host or os.environ.get("METRICS_HOST", "127.0.0.1"), int(port)), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    _server = server
+    return _server
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value, quotes=True)}"' for name, value in labels.items()) + "}"
+
+
+def _escape(text, quotes=False):
+    text = str(text).replace("\\", r"\\").replace("\n", r"\n")
+    return text.replace('"', r'\"') if quotes else text
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(int(value)) if float(value).is_integer() else repr(float(value))
@@ -0,0 +1,143 @@
+"""
+This module guards the calls from the tools to their upstream services.
+
+Each upstream (Polygon, Serper, WeatherAPI, Yahoo Finance) gets a circuit breaker (see
+circuit_breaker.py) and a latency tracker. Idempotent GETs can also be hedged (see hedging.py).
+The fetch functions in `tools/` are decorated with `guarded(...)`. When a breaker is open, the
+fetch fails at once with `CircuitOpen`, and the tool's cache answers with stale data if it has any.
+
+Configuration (environment variables):
+- BREAKER_FAILURE_THRESHOLD: consecutive failures that open a breaker (default 5).
+- BREAKER_RESET_SECONDS: seconds an open breaker waits before letting a probe call through (default 30).
+- HEDGE_REQUESTS: "1" to hedge idempotent GETs after the upstream's p95 latency (default off).
+"""
+
+import functools
+import os
+import threading
+import time
+
+from runtime import metrics
+from runtime.circuit_breaker import BREAKER_STATES, CircuitBreaker, CircuitOpen
+from runtime.deadline import DeadlineExceeded
+from runtime.hedging import Hedger
+
+FAILURE_THRESHOLD = int(os.environ.get("BREAKER_FAILURE_THRESHOLD", "5"))
+RESET_SECONDS = float(os.environ.get("BREAKER_RESET_SECONDS", "30"))
+HEDGE_ENABLED = os.environ.get("HEDGE_REQUESTS", "0") == "1"
+
+# The upstream answered ("location not found"): not a sign of an unhealthy service
+NOT_FAILURES = (LookupError,)
+
+UPSTREAM_REQUESTS = metrics.counter("upstream_requests_total", "Upstream calls by outcome (ok, not_found, error, "
+                                    "deadline, rejected by an open breaker).", ["upstream", "outcome"])
+UPSTREAM_SECONDS = metrics.histogram("upstream_request_seconds", "Duration of upstream calls, hedges included.",
+                                     ["upstream"])
+BREAKER_STATE = metrics.gauge("upstream_breaker_state", "Circuit breaker state (0 closed, 1 half-open, 2 open).",
+                              ["upstream"])
+HEDGE_DELAY = metrics.gauge("upstream_hedge_delay_seconds", "Current hedging delay (recent p95 latency).",
+                            ["upstream"])
+
+_breakers = {}
+_hedgers = {}
+_lock = threading.Lock()
+
+
+def breaker(upstream):
+    """
+    Returns the circuit breaker of an upstream, creating it on first use.
+    """
+    with _lock:
+        if upstream not in _breakers:
+            _breakers[upstream] = CircuitBreaker(upstream, FAILURE_THRESHOLD, RESET_SECONDS)
+        return _breakers[upstream]
+
+
+def hedger(upstream):
+    """
+    Returns the hedger (and latency tracker) of an upstream, creating it on first use.
+    """
+    with _lock:
+        if upstream not in _hedgers:
+            _hedgers[upstream] = Hedger(upstream)
+        return _hedgers[upstream]
+
+
+def guarded(upstream, idempotent=False, hedge=None):
+    """
+    Decorates a fetch function so its calls go through the upstream's circuit breaker.
+    With `idempotent=True` the calls are hedged when enabled (`hedge`, or HEDGE_REQUESTS).
+    """
+    def decorate(fetch):
+        @functools.wraps(fetch)
+        def call(*args, **kwargs):
+            circuit = breaker(upstream)
+            try:
+                circuit.before_call()
+            except CircuitOpen:
+                UPSTREAM_REQUESTS.labels(upstream, "rejected").inc()
+                raise
+            tracker = hedger(upstream)
+            started = time.perf_counter()
+            try:
+                if idempotent and (HEDGE_ENABLED if hedge is None else hedge):
+                    result = tracker.call(_timed, tracker, fetch, *args, **kwargs)
+                else:
+                    result = _timed(tracker, fetch, *args, **kwargs)
+            except NOT_FAILURES:
+                circuit.record_success()
+                _observe(upstream, "not_found", started)
+                raise
+            except DeadlineExceeded:
+                # Out of request time: says nothing about the upstream's health
+                circuit.release()
+                _observe(upstream, "deadline", started)
+                raise
+            except Exception:
+                circuit.record_failure()
+                _observe(upstream, "error", started)
+                raise
+            circuit.record_success()
+            _observe(upstream, "ok", started)
+            return result
+        return call
+    return decorate
+
+
+def upstream_stats():
+    """
+    Returns the breaker state and hedging counters of every upstream.
+    """
+    with _lock:
+        names = sorted(set(_breakers) | set(_hedgers))
+    return {
+        name: {"breaker": breaker(name).stats(), "hedging": hedger(name).stats()}
+        for name in names
+    }
+
+
+def _collect():
+    """
+    Refreshes the breaker state and hedging delay gauges before each metrics export.
+    """
+    for name, stats in upstream_stats().items():
+        BREAKER_STATE.labels(name).set(BREAKER_STATES.index(stats["breaker"]["state"]))
+        HEDGE_DELAY.labels(name).set(stats["hedging"]["delay_seconds"])
+
+
+metrics.register_collector(_collect)
+
+
+def _observe(upstream, outcome, started):
+    UPSTREAM_REQUESTS.labels(upstream, outcome).inc()
+    UPSTREAM_SECONDS.labels(upstream).observe(time.perf_counter() - started)
+
+
+def _timed(tracker, fetch, *args, **kwargs):
+    """
+    Calls `fetch` and records its latency when it succeeds.
+    """
+    started = time.perf_counter()
+    result = fetch(*args, **kwargs)
+    tracker.latency.add(time.perf_counter() - started)
+    return result
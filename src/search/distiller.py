@@ -0,0 +1,143 @@
+"""
+Subfolder: search
+Role: Post-processing of web search responses before they reach the SearchAgent.
+
+File: distiller.py
+Purpose: Turns a raw Serper response into a short, ranked list of distinct sources that fits a
+token budget. The answer box, knowledge graph, organic results, "people also ask" and top
+stories are parsed. Related searches, images and request metadata are dropped. Results are
+deduplicated by canonical URL and by domain (one result per site), ranked by block type,
+position and overlap with the query, and snippets are trimmed until the budget is reached.
+"""
+
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+DEFAULT_TOKEN_BUDGET = 400  # approximate tokens of distilled output per query
+MAX_SNIPPET_TOKENS = 60  # approximate tokens kept per snippet
+MAX_KG_ATTRIBUTES = 5  # knowledge graph attributes kept
+
+# Base score of each response block; organic results also lose a little per position
+BLOCK_PRIORITY = {"answer": 3.0, "knowledge": 2.5, "organic": 2.0, "news": 1.2, "question": 1.0}
+
+_WORD = re.compile(r"\w+")
+
+
+def estimate_tokens(text):
+    """
+    Estimates the number of LLM tokens in `text` (about 4 characters per token in English).
+    """
+    return len(text) // 4 + 1
+
+
+def normalize_query(query):
+    """
+    Normalizes a query into a cache key ("What is  AI?" and "what is ai?" share an entry).
+    """
+    return " ".join(query.lower().split())
+
+
+def canonical_url(url):
+    """
+    Normalizes a URL for deduplication: no scheme, "www.", fragment, tracking parameters or trailing slash.
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower().removeprefix("www.")
+    params = [(k, v) for k, v in parse_qsl(parts.query) if not k.lower().startswith(("utm_", "ref"))]
+    query = f"?{urlencode(params)}" if params else ""
+    return f"{host}{parts.path.rstrip('/')}{query}"
+
+
+def _domain(url):
+    return urlsplit(url).netloc.lower().removeprefix("www.")
+
+
+def _trim(text, max_tokens):
+    """
+    Shortens `text` to about `max_tokens`, cutting at a sentence or word boundary.
+    """
+    text = " ".join(text.split())
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    sentence_end = cut.rfind(". ")
+    if sentence_end > max_chars // 2:
+        return cut[:sentence_end + 1]
+    return cut.rsplit(" ", 1)[0] + "…"
+
+
+def _candidates(response):
+    """
+    Extracts (block, title, text, link, position) tuples from the blocks worth keeping.
+    """
+    answer_box = response.get("answerBox")
+    if answer_box:
+        text = answer_box.get("answer") or answer_box.get("snippet") or ""
+        yield "answer", answer_box.get("title", ""), text, answer_box.get("link", ""), 0
+
+    knowledge = response.get("knowledgeGraph")
+    if knowledge:
+        attributes = list(knowledge.get("attributes", {}).items())[:MAX_KG_ATTRIBUTES]
+        text = " ".join([knowledge.get("description", "")] + [f"{k}: {v}." for k, v in attributes])
+        title = " - ".join(filter(None, [knowledge.get("title"), knowledge.get("type")]))
+        link = knowledge.get("descriptionLink") or knowledge.get("website", "")
+        yield "knowledge", title, text, link, 0
+
+    for result in response.get("organic", []):
+        text = " ".join(filter(None, [result.get("date"), result.get("snippet")]))
+        yield "organic", result.get("title", ""), text, result.get("link", ""), result.get("position", 10)
+
+    for item in response.get("topStories", []) + response.get("news", []):
+        text = " ".join(filter(None, [item.get("source"), item.get("date"), item.get("snippet")]))
+        yield "news", item.get("title", ""), text, item.get("link", ""), item.get("position", 10)
+
+    for item in response.get("peopleAlsoAsk", []):
+        yield "question", item.get("question", ""), item.get("snippet", ""), item.get("link", ""), 0
+
+
+def distill(response, query, token_budget=DEFAULT_TOKEN_BUDGET):
+    """
+    Distills a parsed Serper response into compact, ranked text.
+
+    Args:
+        response (dict): The decoded JSON body returned by Serper.
+        query (str): The user query, used to rank results by term overlap.
+        token_budget (int): Approximate maximum number of tokens of the output.
+
+    Returns:
+        str: One numbered line per kept source ("[n] title: snippet (link)").
+    """
+    query_terms = set(_WORD.findall(query.lower()))
+    seen_urls, seen_domains, ranked = set(), set(), []
+
+    for order, (block, title, text, link, position) in enumerate(_candidates(response)):
+        if not (title or text):
+            continue
+        if link:
+            url, domain = canonical_url(link), _domain(link)
+            # Knowledge and answer blocks are kept even when they cite an already-seen site
+            if url in seen_urls or (block in ("organic", "news") and domain in seen_domains):
+                continue
+            seen_urls.add(url)
+            seen_domains.add(domain)
+
+        words = set(_WORD.findall(f"{title} {text}".lower()))
+        overlap = len(query_terms & words) / len(query_terms) if query_terms else 0.0
+        score = BLOCK_PRIORITY[block] - 0.1 * position + overlap
+        # Direct answers get twice the snippet room of individual results
+        max_tokens = MAX_SNIPPET_TOKENS * (2 if block in ("answer", "knowledge") else 1)
+        ranked.append((-score, order, title, _trim(text, max_tokens), link))
+
+    lines, used = [], 0
+    for _, _, title, text, link in sorted(ranked):
+        line = f"[{len(lines) + 1}] {title}: {text}" + (f" ({link})" if link else "")
+        cost = estimate_tokens(line)
+        if used + cost > token_budget:
+            if lines:
+                break
+            line = _trim(line, token_budget)  # always return at least the best source
+            cost = estimate_tokens(line)
+        lines.append(line)
+        used += cost
+    return "\n".join(lines) if lines else "No relevant search results found."
@@ -29,6 +29,10 @@ class StockTasks:
                 Analyze real-time stock data and provide insights.
                 Consider price movements, trading volume, and any available company information.
                 Provide a concise summary of the stock's current status and any notable trends or events.
+                Start with the stock snapshot tool: it returns prices, company figures and recent news
+                in one call. Pass it the period and interval the question is about (e.g. period '1mo'
+                and interval '1d' for the past month): its price history replaces a separate history
+                call, so only use the other tools for data the snapshot does not cover.
                 {stock}
             """),
             agent=agent,
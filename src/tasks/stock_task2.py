@@ -29,6 +29,8 @@ class NewsTasks:
                 Analyze recent news articles related to specific stocks or the overall market.
                 Consider the potential impact of news events on stock prices or market trends.
                 Provide a concise summary of key news items and their potential market implications.
+                For a single stock, use the stock snapshot tool: it returns the recent news together
+                with the price moves they may explain, in one call.
                 {query}
             """),
             agent=agent,
@@ -29,6 +29,9 @@ class CompareTasks:
                 Compare the following stocks based on the provided information:
                 {stocks}
                 Highlight key differences and similarities.
+                Base the comparison on the metrics table returned by the comparison tool
+                (returns, relative strength, volatility, drawdown, volume ratio, correlation)
+                instead of recomputing figures yourself.
             """),
             agent=agent,
             expected_output="Provide a concise summary of analyses."
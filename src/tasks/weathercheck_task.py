@@ -1,10 +1,11 @@
 """
 This module defines the WeatherAnalaysisTask class to handle weather-related tasks.
-The task uses the WeatherAgent to analyze weather data for a specified city.
+The task uses the WeatherAgent to analyze weather data for one or several cities.
 """
 
 from crewai import Task
 from textwrap import dedent
+import json
 
 class WeatherTasks:
     """
@@ -13,13 +14,14 @@ class WeatherTasks:
     """
 
     @staticmethod
-    def WeatherAnalaysisTask(agent, city):
+    def WeatherAnalaysisTask(agent, cities):
         """
-        Creates and returns a Task to analyze weather data for a specified city.
+        Creates and returns a Task to analyze weather data for the specified cities.
         
         Args:
             agent (Agent): The WeatherAgent that analyzes weather data.
-            city (str): The name of the city for weather analysis.
+            cities (list): The names of the cities for weather analysis, one entry per city
+                (an entry may carry its country, e.g. "Paris, France").
 
         Returns:
             Task: A Task object that encapsulates the weather analysis task.
@@ -28,7 +30,9 @@ class WeatherTasks:
             description=dedent(f"""
                 Analyze weather information. Consider all information.
                 Answer the question using the weather information.
-                {city}
+                If the question involves several cities, fetch them all in one call with the
+                batch weather tool, passing exactly the entries of this list as its cities.
+                Cities: {json.dumps(cities)}
             """),
             agent=agent,
             expected_output="Answer question using weather information"
@@ -0,0 +1,44 @@
+"""
+LLM request metrics of the crewAI agents, which call the model through LiteLLM.
+"""
+
+import time
+
+import pytest
+
+litellm = pytest.importorskip("litellm")
+pytest.importorskip("crewai")
+
+from runtime.instrumentation import LLM_REQUESTS
+
+AZURE_ENV = {
+    "AZURE_OPENAI_API_VERSION": "2024-06-01",
+    "AZURE_OPENAI_API_KEY": "test-key",
+    "AZURE_OPENAI_ENDPOINT": "https://example.invalid",
+    "AZURE_OPENAI_DEPLOYMENT_NAME": "test-deployment",
+}
+
+
+def litellm_requests():
+    return sum(child.value() for (model, client, outcome), child in LLM_REQUESTS.children()
+               if client == "litellm" and outcome == "ok")
+
+
+def test_agent_builds_keep_litellm_metrics(monkeypatch):
+    for name, value in AZURE_ENV.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.delenv("LITELLM_SUCCESS_CALLBACKS", raising=False)
+    monkeypatch.delenv("LITELLM_FAILURE_CALLBACKS", raising=False)
+    from agents.Multi_agents import SearchAgents, WeatherAgents
+
+    # Each agent build runs crewAI's LLM.__init__, which resets LiteLLM's callbacks
+    SearchAgents.SearchAgent()
+    WeatherAgents.WeatherAgent()
+    before = litellm_requests()
+    litellm.completion(model="gpt-4o-mini", messages=[{"role": "user", "content": "Hi"}], mock_response="Hello")
+
+    # LiteLLM may run success callbacks in a background thread
+    stop_at = time.time() + 5
+    while litellm_requests() == before and time.time() < stop_at:
+        time.sleep(0.05)
+    assert litellm_requests() == before + 1
@@ -0,0 +1,31 @@
+"""
+Circuit breakers, stale fallback and hedged requests against the fault-injecting stub server
+(the scenarios of `benchmarks/upstream_resilience.py`).
+"""
+
+import pytest
+
+from benchmarks.fault_stub_server import FaultStubServer
+from benchmarks.upstream_resilience import outage, tail_latency
+from runtime.hedging import MIN_SAMPLES
+
+
+@pytest.fixture
+def server():
+    server = FaultStubServer().start()
+    yield server
+    server.shutdown()
+
+
+def failed(checks):
+    return [description for passed, description in checks if not passed]
+
+
+def test_hedging_cuts_tail_latency(server):
+    # 1000 calls: with fewer, the rare calls whose two attempts both hit the tail can reach the p99
+    server.configure(tail_rate=0.05, tail_seconds=0.3)
+    assert failed(tail_latency(server, calls=1000, concurrency=8, warmup=2 * MIN_SAMPLES)) == []
+
+
+def test_outage_opens_breaker_serves_stale_and_recovers(server):
+    assert failed(outage(server, calls=50, reset_seconds=1.0)) == []
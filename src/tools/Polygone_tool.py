@@ -7,6 +7,10 @@ from the Polygon.io API.
 - Limits the number of articles returned (default is 1).
 - Uses the Polygon.io API to retrieve real-time data about stock-related news.
 - Handles errors gracefully if the API request fails.
+- Caches the latest articles per ticker (one key shared by this tool, the stock snapshot and the
+  cache warmer), so repeated and warmed lookups skip Polygon.io whatever the requested limit.
+- Guards Polygon.io with a circuit breaker (serving stale cached news while it is open)
+  and optionally hedges slow requests.
 
 ### Dependencies:
 - `requests`: To make HTTP requests to the Polygon.io API.
@@ -17,6 +21,10 @@ from langchain.tools import tool
 import requests
 from dotenv import load_dotenv
 import os
+from runtime.deadline import DeadlineExceeded, call_timeout, record_partial
+from cache.ttl_cache import TTLCache
+from runtime.upstream import guarded
+from runtime.instrumentation import instrumented_tool
 
 # Suppress SSL warnings (optional)
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
@@ -27,41 +35,68 @@ load_dotenv('.env')
 
 # Constants
 POLYGONE_API_KEY = os.environ['POLYGONE_API_KEY']
-POLYGONE_BASE_URL = "https://api.polygon.io"
+POLYGONE_BASE_URL = os.environ.get('POLYGONE_BASE_URL', "https://api.polygon.io")
+REQUEST_TIMEOUT = 10  # seconds, further capped by the request deadline
+NEWS_FETCH_LIMIT = 3  # articles fetched and cached per ticker; callers take the first `limit`
+
+# Pooled connections to Polygon.io, shared by all requests of this process
+session = requests.Session()
+session.verify = False
+
+# News cache shared by all requests of this process (also kept warm by cache/warmer.py)
+news_cache = TTLCache("polygon_news", ttl=float(os.environ.get('NEWS_CACHE_TTL', '300')), stale_ttl=3600)
+
+def news_key(ticker):
+    """
+    Returns the `news_cache` key of a ticker's latest articles.
+    """
+    return (ticker,)
+
+@guarded("polygon", idempotent=True)
+def fetch_polygon_news(ticker):
+    """
+    Fetches the latest news articles about a ticker from Polygon.io.
+
+    Returns:
+        list: Up to NEWS_FETCH_LIMIT news articles.
+    """
+    # Define the API endpoint and parameters
+    endpoint = "/v2/reference/news/"
+    url = f"{POLYGONE_BASE_URL}{endpoint}"
+    params = {"ticker": ticker, "limit": NEWS_FETCH_LIMIT, "apiKey": POLYGONE_API_KEY}
+
+    # Fetch the news data
+    response = session.get(url, params=params, timeout=call_timeout(REQUEST_TIMEOUT))
+    response.raise_for_status()  # Raise an exception for HTTP errors
+
+    # Parse and return the relevant news
+    news = response.json()
+    print(news)
+    return news['results'][:NEWS_FETCH_LIMIT]
 
 class Tools:
     
     @tool("Fetch Polygon News")
+    @instrumented_tool
     def get_polygon_news(ticker: str, limit: int = 1):
         """
         Fetches recent news articles from Polygon.io related to a specific stock ticker.
 
         Args:
             ticker (str): The stock ticker symbol (e.g., 'AAPL').
-            limit (int): The number of news articles to fetch (default: 1).
+            limit (int): The number of news articles to return (default: 1, at most 3).
 
         Returns:
             list: A list of news articles with details like headline, timestamp, and summary.
         """
-        def fetch_news():
-            try:
-                # Define the API endpoint and parameters
-                endpoint = "/v2/reference/news/"
-                url = f"{POLYGONE_BASE_URL}{endpoint}"
-                params = {"ticker": ticker, "limit": limit, "apiKey": POLYGONE_API_KEY}
-                
-                # Fetch the news data
-                response = requests.get(url, params=params, verify=False)
-                response.raise_for_status()  # Raise an exception for HTTP errors
-                
-                # Parse and return the relevant news
-                news = response.json()
-                print(news)
-                return news['results'][:3]  # Return top 3 news articles
-                
-            except Exception as e:
-                print(f"Error fetching Polygon.io news for {ticker}: {e}")
-                return []
-
-        # Return the fetched news
-        return fetch_news()
+        try:
+            ticker = ticker.strip().upper()
+            articles = news_cache.get_or_fetch(news_key(ticker), fetch_polygon_news)[:max(1, limit)]
+            record_partial(f"Polygon news for {ticker}", articles)
+            return articles
+        except DeadlineExceeded:
+            # Out of request time: let the agent run stop instead of trying again
+            raise
+        except Exception as e:
+            print(f"Error fetching Polygon.io news for {ticker}: {e}")
+            return []
@@ -4,7 +4,10 @@ It fetches relevant web links and their details based on a given query.
 
 ### Features:
 - Sends a search query to Serper's web search service.
-- Returns search results in a structured format, including web links and details.
+- Returns search results in a compact format: ranked, deduplicated by URL and domain, and trimmed
+  to a token budget, with web links and snippets.
+- Caches distilled results per normalized query.
+- Guards Serper with a circuit breaker (serving stale cached results while it is open).
 - Handles errors gracefully and returns appropriate error messages.
 
 ### Dependencies:
@@ -19,48 +22,90 @@ from dotenv import load_dotenv
 import json 
 import os
 import http.client
+import threading
+from runtime.deadline import DeadlineExceeded, call_timeout, record_partial
+from cache.ttl_cache import TTLCache
+from runtime.upstream import guarded
+from runtime.instrumentation import instrumented_tool
+from search.distiller import distill, estimate_tokens, normalize_query
 
 # Load environment variables securely
 load_dotenv('.env')
 
 # Fetch the Serper API key from environment variables
 SERPER_API_KEY = os.environ['SERPER_SEARCH_API']
+REQUEST_TIMEOUT = 10  # seconds, further capped by the request deadline
+SEARCH_TOKEN_BUDGET = int(os.environ.get('SEARCH_TOKEN_BUDGET', '400'))  # approximate tokens per distilled result
 
-# Set up the HTTPS connection to Serper's search endpoint
-conn = http.client.HTTPSConnection("google.serper.dev")
+# One keep-alive HTTPS connection to Serper per thread (http.client connections are not thread-safe)
+_connections = threading.local()
+
+# Distilled results per normalized query, shared by all requests of this process
+search_cache = TTLCache("serper_search", ttl=float(os.environ.get('SEARCH_CACHE_TTL', '3600')), stale_ttl=86400)
+
+# Searches are POSTs billed per query, so they are never hedged
+@guarded("serper")
+def fetch_search(query):
+    """
+    Sends a query to the Serper API and distills the response (see search/distiller.py).
+
+    Returns:
+        str: The ranked, deduplicated results, trimmed to SEARCH_TOKEN_BUDGET tokens.
+    """
+    # Prepare the payload and headers for the API request
+    payload = json.dumps({"q": query})
+    headers = {
+        'X-API-KEY': SERPER_API_KEY,
+        'Content-Type': 'application/json'
+    }
+
+    conn = getattr(_connections, "conn", None)
+    if conn is None:
+        conn = _connections.conn = http.client.HTTPSConnection("google.serper.dev")
+    try:
+        # Bound the socket operations by the request deadline
+        conn.timeout = call_timeout(REQUEST_TIMEOUT)
+        if conn.sock is not None:
+            conn.sock.settimeout(conn.timeout)
+
+        # Make the POST request to the Serper API
+        conn.request("POST", "/search", payload, headers)
+        res = conn.getresponse()
+        data = res.read()
+    except Exception:
+        # Drop the connection so the next call reconnects
+        conn.close()
+        raise
+    if res.status != 200:
+        raise RuntimeError(f"Serper returned HTTP {res.status}: {data[:200]!r}")
+
+    raw = data.decode("utf-8")
+    distilled = distill(json.loads(raw), query, SEARCH_TOKEN_BUDGET)
+    print(f"Search results for {query}: ~{estimate_tokens(raw)} tokens distilled to ~{estimate_tokens(distilled)}")
+    return distilled
 
 class SerperTools:
     
     @tool("Fetch web search data")
+    @instrumented_tool
     def search_query(query: str):
         """
-        Sends a search query to the Serper API and returns relevant web links.
+        Sends a search query to the Serper API and returns the most relevant web results.
 
         Args:
             query (str): The user query to search on the web.
         
         Returns:
-            dict: A dictionary containing search results or an error message if failed.
+            str: Ranked, deduplicated search results, or a dictionary with an error message if failed.
         """
-        # Prepare the payload and headers for the API request
-        payload = json.dumps({"q": query})
-        headers = {
-            'X-API-KEY': SERPER_API_KEY,
-            'Content-Type': 'application/json'
-        }
-
         try:
-            # Make the POST request to the Serper API
-            conn.request("POST", "/search", payload, headers)
-            res = conn.getresponse()
-            data = res.read()
-
-            # Print the raw data for debugging (optional)
-            print("This is the data: ", data)
-
-            # Decode and return the response as a UTF-8 string
-            return data.decode("utf-8")
+            result = search_cache.get_or_fetch((normalize_query(query),), fetch_search)
+            record_partial(f"Web search for {query}", result)
+            return result
         
+        except DeadlineExceeded:
+            # Out of request time: let the agent run stop instead of trying again
+            raise
         except Exception as e:
             # Handle errors gracefully and return a helpful error message
             print(f"Error getting search details for {query}: {e}")
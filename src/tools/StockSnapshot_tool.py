@@ -0,0 +1,61 @@
+"""
+This script defines a composite tool that returns a complete snapshot of a stock in one call.
+
+### Features:
+- Fetches the market data (Yahoo Finance price history, then company info) and the recent news
+  (Polygon.io) of a ticker concurrently, so the upstream waits overlap.
+- Returns one combined payload (key figures, prices over the requested period, headlines), so the
+  StockAgent needs one tool step instead of one LLM round trip per source, whatever the horizon.
+- Reuses the Yahoo Finance and Polygon.io caches, circuit breakers and stale fallbacks.
+- Still returns the available sections if one source fails.
+
+### Dependencies:
+- `tools.YahooFinance_tool` and `tools.Polygone_tool`: The underlying fetchers and caches.
+- `langchain.tools`: To integrate the snapshot function as a tool in a larger system.
+"""
+
+from langchain.tools import tool
+from runtime.deadline import DeadlineExceeded, check_deadline, record_partial
+from runtime.instrumentation import instrumented_tool
+from analytics.snapshot import build_snapshot
+from tools.YahooFinance_tool import fetch_yahoo_finance_data, yahoo_cache
+from tools.Polygone_tool import fetch_polygon_news, news_cache, news_key
+
+def fetch_market(ticker, period='1d', interval='1m'):
+    return yahoo_cache.get_or_fetch((ticker, period, interval), fetch_yahoo_finance_data)
+
+def fetch_news(ticker):
+    return news_cache.get_or_fetch(news_key(ticker), fetch_polygon_news)
+
+class SnapshotTools:
+
+    @tool("Fetch stock snapshot")
+    @instrumented_tool
+    def get_stock_snapshot(ticker: str, period: str = '1d', interval: str = '1m'):
+        """
+        Fetches everything needed to analyze one stock in a single call: key figures
+        (price, day range, volume, valuation, 52-week range), the price history over `period`
+        and the latest news headlines. Prefer this tool for questions about a single stock, and
+        set `period` and `interval` to the horizon of the question (e.g. '1mo' and '1d' for the
+        past month) instead of fetching the history separately.
+
+        Args:
+            ticker (str): The stock ticker symbol (e.g., 'NVDA').
+            period (str): The period of the price history (default: '1d').
+            interval (str): The interval of the price history (default: '1m').
+
+        Returns:
+            str: The combined snapshot, or a dictionary with an error message if nothing could be fetched.
+        """
+        try:
+            ticker = ticker.strip().upper()
+            snapshot = build_snapshot(ticker, lambda ticker: fetch_market(ticker, period, interval), fetch_news)
+            record_partial(f"Stock snapshot for {ticker}", snapshot)
+            # A section still running at the deadline: the snapshot is kept as a partial result
+            check_deadline()
+            return snapshot
+        except DeadlineExceeded:
+            # Out of request time: let the agent run stop instead of trying again
+            raise
+        except Exception as e:
+            return {"error": f"Error fetching stock snapshot for {ticker}: {e}"}
@@ -1,10 +1,16 @@
 """
-This script defines a tool to fetch current weather data for a given city using the WeatherAPI.
+This script defines tools to fetch current weather data for one or several cities using the WeatherAPI.
 
 ### Features:
 - Fetches current weather data for a specified city using the WeatherAPI.
+- Fetches the weather of several cities concurrently in one tool call.
+- Resolves city names locally (see geo/gazetteer.py), so "Paris", "paris ", "Paris, France"
+  and "Pari" are one location, queried by its coordinates.
 - Returns weather details such as temperature, humidity, and weather conditions.
 - Handles errors gracefully and returns appropriate error messages if data is unavailable.
+- Caches weather per canonical location so repeated and warmed lookups skip WeatherAPI.
+- Guards WeatherAPI with a circuit breaker (serving stale cached weather while it is open)
+  and optionally hedges slow requests.
 
 ### Dependencies:
 - `requests`: For making HTTP requests to the WeatherAPI.
@@ -16,16 +22,64 @@ from langchain.tools import tool
 from dotenv import load_dotenv
 import os
 import requests
+from runtime.deadline import DeadlineExceeded, call_timeout, check_deadline, gather_until_deadline, record_partial
+from cache.ttl_cache import TTLCache
+from runtime.upstream import guarded
+from runtime.instrumentation import instrumented_tool
+from geo.gazetteer import by_id, normalize_name, resolve
 
 # Load environment variables securely
 load_dotenv('.env')
 
 # Fetch the WeatherAPI key from environment variables
 WEATHER_API_KEY = os.environ['WEATHER_API_KEY']
+WEATHER_API_BASE_URL = os.environ.get('WEATHER_API_BASE_URL', "http://api.weatherapi.com")
+REQUEST_TIMEOUT = 10  # seconds, further capped by the request deadline
+BATCH_MAX_CITIES = 20  # cities fetched by one batch call
+
+# Pooled connections to WeatherAPI, shared by all requests of this process
+session = requests.Session()
+session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=BATCH_MAX_CITIES))
+session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=BATCH_MAX_CITIES))
+
+# Weather cache shared by all requests of this process (also kept warm by cache/warmer.py)
+weather_cache = TTLCache("weather", ttl=float(os.environ.get('WEATHER_CACHE_TTL', '600')), stale_ttl=3600)
+
+def location_key(query):
+    """
+    Returns the cache key of a place: its canonical gazetteer ID ("paris-fr"), or the
+    normalized name for places the gazetteer does not know.
+    """
+    location = resolve(query)
+    return location.id if location else normalize_name(query)
+
+@guarded("weatherapi", idempotent=True)
+def fetch_weather(key):
+    """
+    Fetches current weather data for a location key (see `location_key`) from WeatherAPI.
+    Known locations are queried by coordinates, unknown ones by name.
+
+    Raises:
+        LookupError: If WeatherAPI does not know the location.
+    """
+    location = by_id(key)
+    # Construct the endpoint URL for the weather API request
+    endpoint = f"{WEATHER_API_BASE_URL}/v1/current.json"
+    params = {"key": WEATHER_API_KEY, "q": location.coordinates if location else key}
+
+    # Send the GET request to fetch the weather data
+    response = session.get(endpoint, params=params, timeout=call_timeout(REQUEST_TIMEOUT))
+    data = response.json()
+
+    # Check if data for the location is found
+    if not data.get("location"):
+        raise LookupError(f"Weather data not found for {key}")
+    return data
 
 class WeatherTools:
     
     @tool('Fetch weather data')
+    @instrumented_tool
     def get_weather(query: str):
         """
         Fetches current weather information for a given city using WeatherAPI.
@@ -36,21 +90,53 @@ class WeatherTools:
         Returns:
             dict: A dictionary containing weather indicators or an error message if data is unavailable.
         """
-        # Construct the endpoint URL for the weather API request
-        endpoint = f"http://api.weatherapi.com/v1/current.json?key={WEATHER_API_KEY}&q={query}"
-
         try:
-            # Send the GET request to fetch the weather data
-            response = requests.get(endpoint)
-            data = response.json()
-
-            # Check if data for the location is found and return the result
-            if data.get("location"):
-                return data
-            else:
-                return {"error": "Weather data not found"}
+            # Fetch the weather data (or reuse it from the cache)
+            data = weather_cache.get_or_fetch((location_key(query),), fetch_weather)
+            record_partial(f"Weather in {query}", data)
+            return data
         
+        except LookupError:
+            return {"error": "Weather data not found"}
+        except DeadlineExceeded:
+            # Out of request time: let the agent run stop instead of trying again
+            raise
         except Exception as e:
             # Handle any request or API errors
             print(f"Error fetching weather data for {query}: {e}")
             return {"error": f"Error fetching weather data: {e}"}
+
+    @tool('Fetch weather data for several cities')
+    @instrumented_tool
+    def get_weather_batch(cities: list):
+        """
+        Fetches current weather information for several cities at once using WeatherAPI.
+        Use it instead of repeated single-city calls when a question involves more than one city.
+
+        Args:
+            cities (list): The city names, one entry per city (e.g., ['Paris', 'London, UK', 'Tokyo']), at most 20.
+
+        Returns:
+            dict: The weather data of each city, or an error message for the cities without data.
+        """
+        cities = list(dict.fromkeys(cities))[:BATCH_MAX_CITIES]
+        keys = {city: location_key(city) for city in cities}
+        # Cities resolving to the same location share one fetch
+        results = gather_until_deadline({
+            key: (weather_cache.get_or_fetch, (key,), fetch_weather) for key in set(keys.values())
+        })
+
+        weather = {}
+        for city, key in keys.items():
+            data = results[key]
+            if isinstance(data, LookupError):
+                weather[city] = {"error": "Weather data not found"}
+            elif isinstance(data, Exception):
+                print(f"Error fetching weather data for {city}: {data}")
+                weather[city] = {"error": f"Error fetching weather data: {data}"}
+            else:
+                record_partial(f"Weather in {city}", data)
+                weather[city] = data
+        # Cities still running at the deadline: the fetched ones are kept as partial results
+        check_deadline()
+        return weather
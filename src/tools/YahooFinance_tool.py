@@ -3,8 +3,12 @@ This script defines a tool for fetching real-time stock data and historical info
 
 ### Features:
 - Fetches real-time stock data and historical data (price movements, trading volume, etc.) for a single stock ticker.
-- Provides historical stock data and real-time stock information for a list of tickers.
+- Compares a list of tickers from their price and volume history in one batched download,
+  with the comparison metrics computed locally.
 - Handles errors and provides meaningful error messages in case of failed API calls.
+- Caches fetched data per (ticker, period, interval) so repeated and warmed lookups skip Yahoo.
+- Guards Yahoo Finance with a circuit breaker (serving recent cached data while it is open)
+  and optionally hedges slow requests.
 
 ### Dependencies:
 - `yfinance`: For fetching stock data from Yahoo Finance.
@@ -14,9 +18,17 @@ This script defines a tool for fetching real-time stock data and historical info
 
 from langchain.tools import tool
 import yfinance as yf
+import pandas as pd
 from dotenv import load_dotenv
 import requests
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
+from runtime.deadline import DeadlineExceeded, call_timeout, record_partial, run_until_deadline
+from cache.ttl_cache import TTLCache
+from runtime.upstream import guarded
+from runtime.instrumentation import instrumented_tool
+from analytics.comparison import compare
+import os
+import threading
 
 # Suppress SSL warnings (optional)
 requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
@@ -25,9 +37,64 @@ requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
 session = requests.Session()
 session.verify = False
 
+REQUEST_TIMEOUT = 10  # seconds, further capped by the request deadline
+
+# Market data cache shared by all requests of this process (also kept warm by cache/warmer.py)
+# Market data goes stale fast: past the TTL it is only served for a few minutes, while Yahoo is failing
+yahoo_cache = TTLCache("yahoo_finance", ttl=float(os.environ.get('YAHOO_CACHE_TTL', '60')), stale_ttl=300)
+
+@guarded("yahoo", idempotent=True)
+def fetch_yahoo_finance_data(ticker, period='1d', interval='1m'):
+    """
+    Fetches the real-time info and the recent price history of a ticker from Yahoo Finance.
+
+    Returns:
+        tuple: The stock info dict and the last rows of the price history as text.
+    """
+    stock = yf.Ticker(ticker, session=session)
+    # raise_errors: yfinance otherwise logs failures and returns an empty frame, which would be
+    # cached and never count against the circuit breaker
+    yf_data = stock.history(period=period, interval=interval, raise_errors=True, timeout=call_timeout(REQUEST_TIMEOUT))
+    # yfinance takes no timeout for the info request: bound it by the request deadline instead
+    yf_realtime = run_until_deadline(lambda: stock.info)  # Fetch real-time stock info
+    return yf_realtime, yf_data.tail().to_string() if yf_data is not None else 'Data unavailable'
+
+# Price histories of compared ticker lists, keyed by (tickers, period, interval)
+history_cache = TTLCache("yahoo_history", ttl=float(os.environ.get('YAHOO_CACHE_TTL', '60')), stale_ttl=300)
+
+# yf.download collects its frames in module-global state: two concurrent downloads overwrite each
+# other's results, so only one runs at a time in this process
+_download_lock = threading.Lock()
+
+# Not hedged: a hedge would only queue a second download behind the lock
+@guarded("yahoo")
+def fetch_price_history(tickers, period='1d', interval='1m'):
+    """
+    Downloads the history of several tickers in one batched Yahoo Finance request.
+
+    Returns:
+        tuple: Close and volume DataFrames with one column per ticker.
+    """
+    if not _download_lock.acquire(timeout=call_timeout(REQUEST_TIMEOUT)):
+        raise TimeoutError(f"Timed out waiting for another Yahoo Finance download ({', '.join(tickers)})")
+    try:
+        data = yf.download(list(tickers), period=period, interval=interval, group_by='column',
+                           session=session, progress=False, timeout=call_timeout(REQUEST_TIMEOUT))
+    finally:
+        _download_lock.release()
+    # yf.download logs failures instead of raising: an empty or all-NaN result is a failed request,
+    # not data to cache
+    if data.empty or data['Close'].isna().all(axis=None):
+        raise RuntimeError(f"Yahoo Finance returned no price data for {', '.join(tickers)}")
+    closes, volumes = data['Close'], data['Volume']
+    if isinstance(closes, pd.Series):  # single ticker without a ticker column level
+        closes, volumes = closes.to_frame(tickers[0]), volumes.to_frame(tickers[0])
+    return closes, volumes
+
 class YHTools:
     
     @tool("Fetch Yahoo Finance Data")
+    @instrumented_tool
     def get_yahoo_finance_data(ticker: str, period: str = '1d', interval: str = '1m'):
         """
         Fetches real-time stock data and historical information from Yahoo Finance for a given stock ticker.
@@ -41,27 +108,33 @@ class YHTools:
             dict: A dictionary containing historical data and stock information or an error message if the request fails.
         """
         try:
-            # Fetch stock data using yfinance
-            stock = yf.Ticker(ticker, session=session)
-            yf_data = stock.history(period=period, interval=interval)  # Synchronous call for historical data
-            yf_realtime = stock.info  # Fetch real-time stock info
+            # Fetch stock data using yfinance (or the cache)
+            ticker = ticker.strip().upper()
+            yf_realtime, yf_history = yahoo_cache.get_or_fetch((ticker, period, interval), fetch_yahoo_finance_data)
 
             # Prepare the formatted result
             input_data = f"""
             Yahoo Finance Data:
             {yf_realtime}
             Recent Stock History:
-            {yf_data.tail().to_string() if yf_data is not None else 'Data unavailable'}"""
+            {yf_history}"""
             
+            record_partial(f"Yahoo Finance data for {ticker}", input_data)
             return input_data
+        except DeadlineExceeded:
+            # Out of request time: let the agent run stop instead of trying again
+            raise
         except Exception as e:
             # Handle any errors and return a meaningful message
             return {"error": f"Error fetching Yahoo Finance data for {ticker}: {e}"}
             
     @tool("Fetch Yahoo Finance Data for stocks to compare")
+    @instrumented_tool
     def get_yahoo_finance_data_comparison(tickers: list, period: str = '1d', interval: str = '1m'):
         """
-        Fetches real-time stock data and historical information from Yahoo Finance for a list of stock tickers.
+        Compares a list of stock tickers using their Yahoo Finance price and volume history.
+        The metrics are computed locally (see analytics/comparison.py), so the result is one
+        compact table: returns, relative strength, volatility, drawdown, volume ratio and correlations.
 
         Args:
             tickers (list): A list of stock ticker symbols (e.g., ['AAPL', 'AMZN']).
@@ -69,25 +142,19 @@ class YHTools:
             interval (str): The interval for historical data (default: '1m').
 
         Returns:
-            dict: A dictionary containing historical data and stock information for each ticker or an error message.
+            str: The comparison table, or a dictionary with an error message if the request fails.
         """
         try:
-            results = {}
-            # Fetch data for each ticker in the list
-            for ticker in tickers:
-                stock = yf.Ticker(ticker, session=session)
-                yf_data = stock.history(period=period, interval=interval)  # Synchronous call for historical data
-                yf_realtime = stock.info  # Fetch real-time stock info
-                
-                # Prepare the formatted result for each stock
-                input_data = f"""
-                Yahoo Finance Data for {ticker}:
-                {yf_realtime}
-                Recent Stock History for {ticker}:
-                {yf_data.tail().to_string() if yf_data is not None else 'Data unavailable'}"""
-                
-                results[ticker] = input_data
-            return results
+            tickers = tuple(sorted({ticker.strip().upper() for ticker in tickers}))
+            closes, volumes = history_cache.get_or_fetch((tickers, period, interval), fetch_price_history)
+            input_data = f"""
+            Stock comparison ({period} at {interval} intervals, sorted by return):
+            {compare(closes, volumes)}"""
+
+            record_partial(f"Yahoo Finance comparison of {', '.join(tickers)}", input_data)
+            return input_data
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             # Handle errors and return a meaningful message
             return {"error": f"Error fetching Yahoo Finance data for {tickers}: {e}"}
@@ -0,0 +1,325 @@
+"""
+Subfolder: workers
+Role: Optional split deployment where the Chainlit front end only enqueues jobs and a pool of
+worker processes runs the agent workflow.
+
+File: job_queue.py
+Purpose: Pluggable job queues connecting the front end and the workers. A queue carries jobs
+(front end -> workers) and per-job events such as progress and answer tokens (workers -> front end).
+
+Queues are selected by URL with `make_queue`:
+- `memory://`: multiprocessing queues, for a worker pool started by the front-end process.
+- `sqlite:///path/to/jobs.db`: a shared SQLite file, for workers on the same host.
+- `redis://host:port/db`: Redis lists, for workers on other hosts. Any client exposing
+  `lpush`, `brpop`, `rpush`, `blpop`, `llen`, `expire` and `delete` can stand in for `redis.Redis`.
+
+A front end that stops waiting for a job (timeout, client gone) calls `abandon`, so the job's
+pending and late events are dropped instead of piling up.
+"""
+
+import json
+import multiprocessing
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+try:
+    import redis
+except ImportError:  # Redis support is optional
+    redis = None
+
+
+class JobQueue:
+    """
+    Interface shared by all job queues.
+    """
+
+    def submit(self, job_id, payload):
+        """
+        Enqueues a job. `payload` must be JSON-serializable.
+        """
+        raise NotImplementedError
+
+    def next_job(self, timeout):
+        """
+        Waits up to `timeout` seconds for a job and returns `(job_id, payload)`, or None.
+        """
+        raise NotImplementedError
+
+    def publish(self, job_id, event):
+        """
+        Sends an event (a JSON-serializable dict) back to the front end waiting on `job_id`.
+        """
+        raise NotImplementedError
+
+    def poll_events(self, job_id, timeout):
+        """
+        Waits up to `timeout` seconds for events of `job_id` and returns all that are available.
+        """
+        raise NotImplementedError
+
+    def abandon(self, job_id):
+        """
+        Stops waiting for `job_id`: drops its pending events and any event published later.
+        """
+        raise NotImplementedError
+
+    def depth(self):
+        """
+        Returns the number of jobs waiting for a worker.
+        """
+        raise NotImplementedError
+
+
+class InMemoryJobQueue(JobQueue):
+    """
+    Job queue backed by multiprocessing queues. Workers must be started by the process that
+    created the queue (see `WorkerPool`).
+    """
+
+    def __init__(self):
+        context = multiprocessing.get_context("spawn")
+        self._jobs = context.Queue()
+        self._events = context.Queue()
+        self._pending = context.Value("i", 0)
+        self._mailboxes = {}
+        self._abandoned = set()
+        self._router = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Only the cross-process queues travel to the worker processes
+        return {"_jobs": self._jobs, "_events": self._events, "_pending": self._pending}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._mailboxes = {}
+        self._abandoned = set()
+        self._router = None
+        self._lock = threading.Lock()
+
+    def submit(self, job_id, payload):
+        with self._pending.get_lock():
+            self._pending.value += 1
+        self._jobs.put((job_id, payload))
+
+    def next_job(self, timeout):
+        try:
+            job = self._jobs.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        with self._pending.get_lock():
+            self._pending.value -= 1
+        return job
+
+    def publish(self, job_id, event):
+        self._events.put((job_id, event))
+
+    def poll_events(self, job_id, timeout):
+        mailbox = self._mailbox(job_id)
+        try:
+            events = [mailbox.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while not mailbox.empty():
+            events.append(mailbox.get_nowait())
+        if any(event.get("type") in ("done", "error") for event in events):
+            with self._lock:
+                self._mailboxes.pop(job_id, None)
+        return events
+
+    def abandon(self, job_id):
+        with self._lock:
+            self._mailboxes.pop(job_id, None)
+            self._abandoned.add(job_id)
+
+    def depth(self):
+        return self._pending.value
+
+    def _mailbox(self, job_id):
+        """
+        Returns the local mailbox of a job, starting the thread that routes worker events on first use.
+        """
+        with self._lock:
+            if self._router is None:
+                self._router = threading.Thread(target=self._route_events, daemon=True)
+                self._router.start()
+            return self._mailboxes.setdefault(job_id, queue.Queue())
+
+    def _route_events(self):
+        while True:
+            job_id, event = self._events.get()
+            with self._lock:
+                if job_id in self._abandoned:
+                    # Nobody reads these events any more; forget the job at its last one
+                    if event.get("type") in ("done", "error"):
+                        self._abandoned.discard(job_id)
+                    continue
+                mailbox = self._mailboxes.setdefault(job_id, queue.Queue())
+            mailbox.put(event)
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Job queue stored in a SQLite file shared by the front end and the workers of one host.
+    """
+
+    POLL_INTERVAL = 0.05  # seconds between polls while waiting
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._cursors = {}
+        with self._connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY, payload TEXT, status TEXT, created REAL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+            conn.execute("""CREATE TABLE IF NOT EXISTS events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT, job_id TEXT, event TEXT)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS events_job ON events (job_id, seq)")
+
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+    def _connect(self):
+        """
+        Returns the connection of the calling thread, opening it on first use.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def submit(self, job_id, payload):
+        self._connect().execute("INSERT INTO jobs VALUES (?, ?, 'queued', ?)",
+                                (job_id, json.dumps(payload), time.time()))
+
+    def next_job(self, timeout):
+        conn = self._connect()
+        stop_at = time.time() + timeout
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT id, payload FROM jobs WHERE status = 'queued' "
+                               "ORDER BY created LIMIT 1").fetchone()
+            if row:
+                conn.execute("UPDATE jobs SET status = 'running' WHERE id = ?", (row[0],))
+            conn.execute("COMMIT")
+            if row:
+                return row[0], json.loads(row[1])
+            if time.time() >= stop_at:
+                return None
+            time.sleep(self.POLL_INTERVAL)
+
+    def publish(self, job_id, event):
+        conn = self._connect()
+        # Events of abandoned jobs are dropped
+        conn.execute("INSERT INTO events (job_id, event) SELECT ?, ? "
+                     "WHERE EXISTS (SELECT 1 FROM jobs WHERE id = ? AND status = 'running')",
+                     (job_id, json.dumps(event), job_id))
+        if event.get("type") in ("done", "error"):
+            conn.execute("UPDATE jobs SET status = 'finished' WHERE id = ? AND status = 'running'", (job_id,))
+            conn.execute("DELETE FROM jobs WHERE id = ? AND status = 'abandoned'", (job_id,))
+
+    def poll_events(self, job_id, timeout):
+        conn = self._connect()
+        stop_at = time.time() + timeout
+        while True:
+            rows = conn.execute("SELECT seq, event FROM events WHERE job_id = ? AND seq > ? ORDER BY seq",
+                                (job_id, self._cursors.get(job_id, 0))).fetchall()
+            if rows:
+                self._cursors[job_id] = rows[-1][0]
+                events = [json.loads(event) for _, event in rows]
+                if any(event.get("type") in ("done", "error") for event in events):
+                    self._cursors.pop(job_id, None)
+                    conn.execute("DELETE FROM events WHERE job_id = ?", (job_id,))
+                    conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+                return events
+            if time.time() >= stop_at:
+                return []
+            time.sleep(self.POLL_INTERVAL)
+
+    def abandon(self, job_id):
+        conn = self._connect()
+        self._cursors.pop(job_id, None)
+        conn.execute("DELETE FROM events WHERE job_id = ?", (job_id,))
+        # A running job keeps its row until the worker's last event, so that event is dropped too
+        conn.execute("DELETE FROM jobs WHERE id = ? AND status != 'running'", (job_id,))
+        conn.execute("UPDATE jobs SET status = 'abandoned' WHERE id = ?", (job_id,))
+
+    def depth(self):
+        return self._connect().execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+
+class RedisJobQueue(JobQueue):
+    """
+    Job queue stored in Redis lists, for workers running on other hosts.
+    """
+
+    JOBS_KEY = "crew:jobs"
+    EVENTS_KEY = "crew:events:{}"
+    EVENTS_TTL = 3600  # seconds an unread event list is kept
+
+    def __init__(self, url=None, client=None):
+        if client is None:
+            if redis is None:
+                raise ImportError("The `redis` package is required for redis:// job queues.")
+            client = redis.Redis.from_url(url)
+        self.url = url
+        self.client = client
+
+    def __getstate__(self):
+        # Reconnect from the URL in worker processes; stand-in clients are passed as-is
+        return {"url": self.url, "client": None if self.url else self.client}
+
+    def __setstate__(self, state):
+        self.__init__(state["url"], state["client"])
+
+    def submit(self, job_id, payload):
+        self.client.lpush(self.JOBS_KEY, json.dumps({"id": job_id, "payload": payload}))
+
+    def next_job(self, timeout):
+        item = self.client.brpop(self.JOBS_KEY, timeout=max(1, int(timeout)))
+        if item is None:
+            return None
+        job = json.loads(item[1])
+        return job["id"], job["payload"]
+
+    def publish(self, job_id, event):
+        key = self.EVENTS_KEY.format(job_id)
+        self.client.rpush(key, json.dumps(event))
+        self.client.expire(key, self.EVENTS_TTL)
+
+    def poll_events(self, job_id, timeout):
+        item = self.client.blpop(self.EVENTS_KEY.format(job_id), timeout=max(1, int(timeout)))
+        return [json.loads(item[1])] if item else []
+
+    def abandon(self, job_id):
+        # Events published later recreate the list; it then expires after EVENTS_TTL
+        self.client.delete(self.EVENTS_KEY.format(job_id))
+
+    def depth(self):
+        return self.client.llen(self.JOBS_KEY)
+
+
+def make_queue(url):
+    """
+    Creates the job queue described by `url` (`memory://`, `sqlite:///path` or `redis://...`).
+    """
+    if url.startswith("memory://"):
+        return InMemoryJobQueue()
+    if url.startswith("sqlite:///"):
+        path = url[len("sqlite:///"):]
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        return SQLiteJobQueue(path)
+    if url.startswith(("redis://", "rediss://")):
+        return RedisJobQueue(url)
+    raise ValueError(f"Unsupported job queue URL: {url}")
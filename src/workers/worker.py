@@ -0,0 +1,164 @@
+"""
+This module defines the worker processes of the split deployment.
+
+Each worker process builds the compiled workflow once and serves jobs from several threads,
+so every job handled by a process reuses the same warm tool caches, HTTP sessions and LLM
+clients. Progress (one event per finished node) and the answer tokens are published back to
+the front end through the job queue.
+
+Run standalone workers against a shared queue with:
+
+    python -m workers.worker --queue sqlite:///jobs.db --processes 4
+"""
+
+import argparse
+import importlib
+import multiprocessing
+import os
+import threading
+import time
+import traceback
+
+from cache.warmer import start_default_warmer
+from runtime import metrics
+from runtime.checkpoint import prepare_run, schedule_cleanup
+from workers.job_queue import make_queue
+
+DEFAULT_WORKFLOW_FACTORY = "orchestrator.workflow:create_resumable_workflow"
+TOKEN_CHUNK_CHARS = 16  # characters per streamed token event
+
+JOBS_IN_FLIGHT = metrics.gauge("worker_jobs_in_flight", "Jobs being run by this worker process.")
+JOB_SECONDS = metrics.histogram("worker_job_seconds", "Duration of jobs, from pickup to answer.", ["outcome"])
+
+
+def load_factory(path):
+    """
+    Imports a workflow factory given as `module:function`.
+    """
+    module_name, _, attribute = path.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def run_job(app, job_queue, job_id, payload):
+    """
+    Runs one job through the compiled workflow and publishes its progress and answer.
+    """
+    inputs = {"query": payload["query"], "messages": [payload["query"]], "partial": False,
+              "deadline": payload.get("deadline")}
+    config = {"configurable": {"thread_id": payload.get("thread_id", job_id)}}
+    messages, category, partial = inputs["messages"], None, False
+    started, outcome = time.perf_counter(), "error"
+    prepared, failed = False, True
+    JOBS_IN_FLIGHT.inc()
+    try:
+        graph_input = prepare_run(app, inputs, config)
+        prepared = True
+        for update in app.stream(graph_input, config, stream_mode="updates"):
+            for node, values in update.items():
+                if values and values.get("messages"):
+                    messages = values["messages"]
+                if values and values.get("category"):
+                    category = values["category"]
+                if values and values.get("partial"):
+                    partial = True
+                job_queue.publish(job_id, {"type": "progress", "node": node})
+        failed = False
+
+        answer = str(messages[-1])
+        for start in range(0, len(answer), TOKEN_CHUNK_CHARS):
+            job_queue.publish(job_id, {"type": "token", "text": answer[start:start + TOKEN_CHUNK_CHARS]})
+        # The front end labels its request metrics with the routed category
+        job_queue.publish(job_id, {"type": "done", "category": category, "partial": partial})
+        outcome = "ok"
+    except Exception as e:
+        traceback.print_exc()
+        job_queue.publish(job_id, {"type": "error", "message": str(e)})
+    finally:
+        if prepared:  # a run rejected as still in progress must not touch that run's status
+            schedule_cleanup(app, config, failed)
+        JOBS_IN_FLIGHT.dec()
+        JOB_SECONDS.labels(outcome).observe(time.perf_counter() - started)
+
+
+def serve(job_queue, workflow_factory=DEFAULT_WORKFLOW_FACTORY, threads=4, stop_event=None, metrics_port=None,
+          processes=1):
+    """
+    Serves jobs from `job_queue` with `threads` threads sharing one compiled workflow.
+    `processes` is the size of the pool this process belongs to. Blocks until `stop_event` is set (or forever).
+    """
+    app = load_factory(workflow_factory)()
+    # Each process owns its caches, so each keeps its own hot keys warm (when CACHE_WARMER_ENABLED=1),
+    # with its share of the host's upstream budget
+    start_default_warmer(budget_share=1 / processes)
+    # ...and its own metrics, served on a port of its own
+    if metrics_port is not None:
+        metrics.start_metrics_server(metrics_port)
+    stop_event = stop_event or threading.Event()
+
+    def loop():
+        while not stop_event.is_set():
+            job = job_queue.next_job(timeout=1.0)
+            if job is not None:
+                run_job(app, job_queue, *job)
+
+    workers = [threading.Thread(target=loop, daemon=True) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+class WorkerPool:
+    """
+    A pool of worker processes serving one job queue.
+    """
+
+    def __init__(self, job_queue, processes=2, threads=4, workflow_factory=DEFAULT_WORKFLOW_FACTORY):
+        self.job_queue = job_queue
+        self.processes = processes
+        self.threads = threads
+        self.workflow_factory = workflow_factory
+        self._context = multiprocessing.get_context("spawn")
+        self._stop_event = self._context.Event()
+        self._workers = []
+
+    def start(self):
+        # Worker i serves its metrics on WORKER_METRICS_PORT + i (when set)
+        base_port = os.environ.get("WORKER_METRICS_PORT")
+        for index in range(self.processes):
+            worker = self._context.Process(
+                target=serve,
+                args=(self.job_queue, self.workflow_factory, self.threads, self._stop_event,
+                      int(base_port) + index if base_port else None, self.processes),
+                daemon=True,
+            )
+            worker.start()
+            self._workers.append(worker)
+        return self
+
+    def join(self):
+        for worker in self._workers:
+            worker.join()
+
+    def stop(self, timeout=5):
+        self._stop_event.set()
+        for worker in self._workers:
+            worker.join(timeout)
+            if worker.is_alive():
+                worker.terminate()
+        self._workers = []
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run agent workers against a shared job queue.")
+    parser.add_argument("--queue", required=True, help="Job queue URL (sqlite:///... or redis://...)")
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--workflow", default=DEFAULT_WORKFLOW_FACTORY)
+    args = parser.parse_args()
+
+    pool = WorkerPool(make_queue(args.queue), args.processes, args.threads, args.workflow).start()
+    try:
+        pool.join()
+    except KeyboardInterrupt:
+        pool.stop()